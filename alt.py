@@ -0,0 +1,165 @@
+import mmap
+import random
+import struct
+import backends
+from array import array
+
+'''
+A* search with landmark (ALT) potentials.
+
+For a landmark L and a target t, the triangle inequality gives two lower bounds of the distance from v to t:
+d(L, t) - d(L, v) and d(v, L) - d(t, L). The potential of v is the largest bound over all landmarks,
+which is consistent, so the keys dist[v] + potential(v) extracted from the heap never decrease
+and the radix heaps can drive the search. A node that can not reach t through a landmark is never inserted.
+
+The distances from and to each landmark are stored as flat arrays (32 bit when they fit),
+with -1 for unreachable nodes, and can be saved to a file that is memory mapped when loaded.
+The tables hold the version of the graph they were computed on (Graph.version), a search on a graph whose
+arcs changed since then raises ValueError: the bounds are not valid anymore and the tables must be selected again.
+'''
+
+MAGIC = b'RHALT002'
+# magic, n, the number of landmarks, version of the graph, typecode of the tables
+HEADER = struct.Struct('=8sqqq8s')
+
+class Landmarks():
+    def __init__(self, n, landmarks, from_dist, to_dist, version=0):
+        self.n = n
+        self.landmarks = landmarks
+        # from_dist[i * n + v] = d(landmarks[i], v), to_dist[i * n + v] = d(v, landmarks[i])
+        self.from_dist = from_dist
+        self.to_dist = to_dist
+        self.version = version
+
+    # Choose count landmarks, each one the reachable node farthest from the landmarks chosen before
+    @classmethod
+    def select(cls, graph, count, backend='One Level', seed=0):
+        inf = graph.n * graph.C + 1
+        reverse = graph.reverse()
+        landmarks = []
+        from_rows = []
+        to_rows = []
+        nearest = [inf] * graph.n
+        candidate = random.Random(seed).randrange(graph.n)
+        for _ in range(min(count, graph.n)):
+            landmarks.append(candidate)
+            from_rows.append(graph.dijkstra_radix(candidate, level=backend))
+            to_rows.append(reverse.dijkstra_radix(candidate, level=backend))
+            farthest = -1
+            for v, d in enumerate(from_rows[-1]):
+                if d < nearest[v]:
+                    nearest[v] = d
+                if nearest[v] < inf and nearest[v] > 0 and (farthest == -1 or nearest[v] > nearest[farthest]):
+                    farthest = v
+            if farthest == -1:
+                break
+            candidate = farthest
+
+        largest = max((d for row in from_rows + to_rows for d in row if d < inf), default=0)
+        typecode = 'i' if largest < 2 ** 31 - 1 else 'q'
+        from_dist = array(typecode, [d if d < inf else -1 for row in from_rows for d in row])
+        to_dist = array(typecode, [d if d < inf else -1 for row in to_rows for d in row])
+        return cls(graph.n, landmarks, from_dist, to_dist, graph.version)
+
+    def save(self, path):
+        typecode = self.from_dist.typecode if isinstance(self.from_dist, array) else self.from_dist.format
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.n, len(self.landmarks), self.version, typecode.encode()))
+            f.write(array('q', self.landmarks).tobytes())
+            f.write(memoryview(self.from_dist).cast('B'))
+            f.write(memoryview(self.to_dist).cast('B'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, count, version, typecode = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('%s is not a landmark file' % path)
+
+        typecode = typecode.rstrip(b'\0').decode()
+        size = array(typecode).itemsize * n * count
+        view = memoryview(data)
+        start = HEADER.size
+        landmarks = list(view[start:start + 8 * count].cast('q'))
+        start += 8 * count
+        from_dist = view[start:start + size].cast(typecode)
+        to_dist = view[start + size:start + 2 * size].cast(typecode)
+        return cls(n, landmarks, from_dist, to_dist, version)
+
+    # Lower bound terms that are valid for the target t: (table, offset of the landmark row, distance of t)
+    def _terms(self, t):
+        terms = []
+        for i in range(len(self.landmarks)):
+            offset = i * self.n
+            if self.from_dist[offset + t] >= 0:
+                terms.append((self.from_dist, offset, self.from_dist[offset + t]))
+            if self.to_dist[offset + t] >= 0:
+                terms.append((self.to_dist, offset, self.to_dist[offset + t]))
+        return terms
+
+    # Distance from s to t on graph, n * C + 1 if t is not reachable
+    def shortest_path(self, graph, s, t, backend='One Level', stats=None):
+        if self.version != graph.version:
+            raise ValueError('the landmarks were selected on version %s of the graph, it is at version %s: select them again'
+                             % (self.version, graph.version))
+        if backend == 'auto':
+            backend = backends.choose(graph.n, graph.m, graph.C, exclude=('dial',))
+        if backends.parse(backend)[0] == 'dial':
+            raise ValueError('A* keys can exceed the last minimum by more than C, Dial buckets do not hold them')
+        inf = graph.n * graph.C + 1
+        from_dist = self.from_dist
+        terms = self._terms(t)
+        # potential[v] is -1 until it is computed, -2 if v can not reach t
+        potential = [-1] * graph.n
+
+        def compute_potential(v):
+            best = 0
+            for table, offset, t_dist in terms:
+                d = table[offset + v]
+                if table is from_dist:
+                    bound = t_dist - d if d >= 0 else 0
+                elif d < 0:
+                    # v can not reach the landmark but t can, so v can not reach t
+                    return -2
+                else:
+                    bound = d - t_dist
+                if best < bound:
+                    best = bound
+            return best
+
+        potential[s] = compute_potential(s)
+        if potential[s] == -2:
+            return inf
+
+        # A key is a distance plus a potential, which is at most twice the longest distance
+        radixheap = graph._reused_heap(backend, stats=stats, C=2 * graph.C)
+        offsets = graph.offsets
+        targets = graph.targets
+        weights = graph.weights
+        dist = [inf] * graph.n
+        dist[s] = 0
+        radixheap.insert(s, potential[s])
+
+        while len(radixheap) > 0:
+            u, _ = radixheap.delete_min()
+            if u == t:
+                return dist[t]
+
+            d = dist[u]
+            start = offsets[u]
+            end = offsets[u + 1]
+            for v, weight in zip(targets[start:end], weights[start:end]):
+                if dist[v] > d + weight:
+                    if dist[v] == inf:
+                        if potential[v] == -1:
+                            potential[v] = compute_potential(v)
+                        if potential[v] == -2:
+                            continue
+                        dist[v] = d + weight
+                        radixheap.insert(v, dist[v] + potential[v])
+                    else:
+                        dist[v] = d + weight
+                        radixheap.decrease(v, dist[v] + potential[v])
+
+        return inf
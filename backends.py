@@ -0,0 +1,139 @@
+import json
+import math
+import os
+from typing import Protocol
+from radix_heap import RadixHeap
+from radix_heap_2 import RadixHeap2
+from monotone_radix_heap import MonotoneRadixHeap
+from f_heap import FibonacciHeap
+from dial_heap import DialHeap
+from dary_heap import DaryHeap
+
+'''
+Registry of the priority queues used by the shortest path searches.
+
+A backend is registered under a name with the aliases it is known by (the level strings of Graph.dijkstra_radix)
+and the default values of its parameters. A backend is selected by a spec, its name or alias optionally followed by
+parameters, e.g. 'radix2:K=8' or 'dary:D=2'. A per bucket segment schedule is written with slashes, 'radix2:K=2/4/8'.
+
+The spec 'auto' chooses a backend from n, m and C of the graph. The choice uses a cost model calibrated by
+benchmark runs (calibrate), stored as JSON: every sample is a graph (n, m, C) with the time of each backend
+per node and arc, and the cost of a backend is predicted by weighting the samples by their closeness in
+log(n), log(m / n) and log(C). Without a model file, Dial is chosen while C is at most n and the monotone
+radix heap otherwise.
+'''
+
+class PriorityQueue(Protocol):
+    def insert(self, label, d): ...
+    def insert_many(self, labels, dists): ...
+    def decrease(self, label, d): ...
+    # Returns (label, d) of a node with the minimum distance
+    def delete_min(self): ...
+    # Empties the heap for another search, stats replaces the operation counters
+    def reset(self, stats=None): ...
+    def __len__(self): ...
+
+# name -> (factory(n, C, debug=..., stats=..., **params), default params)
+_registry = {}
+# name or alias -> name
+_aliases = {}
+
+def register(name, factory, aliases=(), **defaults):
+    _registry[name] = (factory, defaults)
+    _aliases[name] = name
+    for alias in aliases:
+        _aliases[alias] = name
+
+def names():
+    return list(_registry)
+
+# Split a spec into (name, params)
+def parse(spec):
+    name, _, options = spec.partition(':')
+    if name not in _aliases:
+        raise ValueError('unknown backend %r, registered: %s' % (name, ', '.join(names())))
+    params = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        params[key.strip()] = tuple(int(v) for v in value.split('/')) if '/' in value else int(value)
+    return _aliases[name], params
+
+def create(spec, n, C, debug=False, stats=None, **params):
+    name, spec_params = parse(spec)
+    factory, defaults = _registry[name]
+    options = dict(defaults)
+    options.update(spec_params)
+    options.update(params)
+    return factory(n, C, debug=debug, stats=stats, **options)
+
+register('radix', RadixHeap, aliases=('One Level',))
+register('monotone', MonotoneRadixHeap, aliases=('Monotone',))
+register('dial', DialHeap, aliases=('Dial',))
+register('dary', DaryHeap, aliases=('D-ary Heap',), D=4)
+register('radix2', RadixHeap2, aliases=('Two level',), K=4)
+register('fibonacci', FibonacciHeap, aliases=('Fibonacci', 'Two level + Fibonacci Heap'), K=4)
+
+# The cost model file, RADIX_HEAP_MODEL overrides the location
+MODEL_PATH = os.environ.get('RADIX_HEAP_MODEL', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend_model.json'))
+
+# Specs timed by calibrate. The Fibonacci extension is left out, it is slower than the plain two level heap on every input
+CALIBRATION_SPECS = ['radix', 'monotone', 'dial', 'dary:D=2', 'dary:D=4', 'dary:D=8', 'radix2:K=2', 'radix2:K=4', 'radix2:K=8']
+
+# path -> (modification time, model)
+_models = {}
+
+def load_model(path=MODEL_PATH):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if path not in _models or _models[path][0] != mtime:
+        with open(path) as f:
+            _models[path] = (mtime, json.load(f))
+    return _models[path][1]
+
+# Time every spec on the graph and store the costs as a sample of the model, replacing a sample of the same size
+def calibrate(graph, specs=CALIBRATION_SPECS, src=0, repeat=3, path=MODEL_PATH):
+    import benchmark
+    results = benchmark.run(graph, src=src, repeat=repeat, memory=False, backends=[(spec, spec) for spec in specs])
+    sample = {
+        'n': graph.n,
+        'm': graph.m,
+        'C': graph.C,
+        'ns_per_item': {result['backend']: result['median_ms'] * 1e6 / (graph.n + graph.m) for result in results},
+    }
+    model = load_model(path) or {'samples': []}
+    model['samples'] = [s for s in model['samples'] if (s['n'], s['m'], s['C']) != (graph.n, graph.m, graph.C)]
+    model['samples'].append(sample)
+    with open(path, 'w') as f:
+        json.dump(model, f, indent=2)
+    return sample
+
+def _features(n, m, C):
+    return (math.log(max(n, 1)), math.log(max(m, 1) / max(n, 1)), math.log(C + 1))
+
+# The spec predicted to be the fastest on a graph, names in exclude are never chosen
+def choose(n, m, C, exclude=(), path=MODEL_PATH):
+    model = load_model(path)
+    if not model or not model['samples']:
+        return _default(n, C, exclude)
+
+    x = _features(n, m, C)
+    totals = {}
+    for sample in model['samples']:
+        y = _features(sample['n'], sample['m'], sample['C'])
+        weight = 1 / (sum((a - b) ** 2 for a, b in zip(x, y)) + 1e-9)
+        for spec, cost in sample['ns_per_item'].items():
+            if parse(spec)[0] in exclude:
+                continue
+            total = totals.setdefault(spec, [0.0, 0.0])
+            total[0] += weight * cost
+            total[1] += weight
+    # Only the specs timed on every sample are compared
+    complete = [spec for spec, total in totals.items() if all(spec in s['ns_per_item'] for s in model['samples'])]
+    if not complete:
+        return _default(n, C, exclude)
+    return min(complete, key=lambda spec: totals[spec][0] / totals[spec][1])
+
+def _default(n, C, exclude):
+    return 'dial' if C <= n and 'dial' not in exclude else 'monotone'
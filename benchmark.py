@@ -0,0 +1,276 @@
+import csv
+import gc
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from heap_stats import HeapStats
+
+'''
+Benchmark of the shortest path backends on one graph.
+
+Every backend is warmed up, then the timed repetitions run in rounds that visit the backends in a shuffled order,
+so neither the warm-up state nor the position in the sequence favours one of them.
+Garbage is collected before and the collector is disabled during each timed run.
+The peak memory is measured with tracemalloc in a separate run, since tracing slows the code down.
+All backends must produce the same distances as the first one.
+Every run of a heap backend builds its heap, as heapq builds its list, so the times and the peak memory
+compare whole searches and not the reuse of the heap of a graph workspace.
+'''
+
+# (name, level of Graph.dijkstra_radix), heapq runs Graph.dijkstra_naive and DELTA runs Graph.dijkstra_delta
+DELTA = 'delta'
+BACKENDS = [
+    ('heapq', None),
+    ('Delta-stepping', DELTA),
+    ('D-ary heap', 'D-ary Heap'),
+    ('Radix level1', 'One Level'),
+    ('Radix monotone', 'Monotone'),
+    ('Dial', 'Dial'),
+    ('Radix level2', 'Two level'),
+    ('Fib. Heap', 'Two level + Fibonacci Heap'),
+]
+
+FIELDS = ['backend', 'repeat', 'median_ms', 'p95_ms', 'min_ms', 'max_ms', 'peak_kib', 'n', 'distance', 'agrees']
+SCALING_FIELDS = ['n', 'm', 'workers', 'median_ms', 'speedup', 'agrees']
+REPLAY_FIELDS = ['backend', 'repeat', 'median_ms', 'min_ms', 'ns_per_op']
+
+# Run one backend, options (debug, stats) are passed to the heap backends only, except predecessors
+def solve(graph, src, level, **options):
+    if level == DELTA:
+        return graph.dijkstra_delta(src, predecessors=options.get('predecessors', False))
+    if level is None:
+        return graph.dijkstra_naive(src, predecessors=options.get('predecessors', False))
+    return graph.dijkstra_radix(src, level=level, reuse=False, **options)
+
+def run(graph, src=0, repeat=5, warmup=1, memory=True, backends=BACKENDS, seed=0):
+    samples = {name: [] for name, _ in backends}
+    dists = {}
+    for name, level in backends:
+        for _ in range(warmup):
+            dists[name] = solve(graph, src, level)
+
+    order = list(backends)
+    rand = random.Random(seed)
+    for _ in range(repeat):
+        rand.shuffle(order)
+        for name, level in order:
+            elapsed, dists[name] = _timed(graph, src, level)
+            samples[name].append(elapsed)
+
+    reference = _normalize(graph, dists[backends[0][0]])
+    results = []
+    for name, level in backends:
+        times = sorted(samples[name])
+        dist = _normalize(graph, dists[name])
+        results.append({
+            'backend': name,
+            'repeat': repeat,
+            'median_ms': statistics.median(times) / 1e6,
+            'p95_ms': _percentile(times, 95) / 1e6,
+            'min_ms': times[0] / 1e6,
+            'max_ms': times[-1] / 1e6,
+            'peak_kib': _peak_memory(graph, src, level) / 1024 if memory else None,
+            'n': len(dist),
+            'distance': sum(d for d in dist if d is not None),
+            'agrees': dist == reference,
+        })
+    return results
+
+# Median times of each backend without and with predecessor recording, timed in shuffled rounds like run
+def predecessor_overhead(graph, src=0, repeat=5, warmup=1, backends=BACKENDS, seed=0):
+    order = [(name, level, recording) for name, level in backends for recording in (False, True)]
+    samples = {(name, recording): [] for name, _, recording in order}
+    for name, level, recording in order:
+        for _ in range(warmup):
+            solve(graph, src, level, predecessors=recording)
+
+    rand = random.Random(seed)
+    for _ in range(repeat):
+        rand.shuffle(order)
+        for name, level, recording in order:
+            samples[(name, recording)].append(_timed(graph, src, level, predecessors=recording)[0])
+
+    results = []
+    for name, _ in backends:
+        plain = statistics.median(samples[(name, False)]) / 1e6
+        recording = statistics.median(samples[(name, True)]) / 1e6
+        results.append({'backend': name, 'plain_ms': plain, 'recording_ms': recording,
+                        'overhead_pct': 100 * (recording - plain) / plain})
+    return results
+
+# Median times of the delta-stepping with each number of workers (1 is the sequential engine) and the speedup over it.
+# The pool of a parallel engine is started before the timed runs.
+def delta_scaling(graph, workers=(1, 2, 4), src=0, repeat=3):
+    import delta_stepping
+    reference = None
+    results = []
+    for count in workers:
+        if count == 1:
+            engine = None
+            run_once = lambda: graph.dijkstra_delta(src)
+        else:
+            engine = delta_stepping.ParallelDeltaStepping(graph, count)
+            run_once = lambda: engine.solve(src)
+        try:
+            run_once()
+            times = []
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter_ns()
+                dist = run_once()
+                times.append(time.perf_counter_ns() - start)
+        finally:
+            if engine is not None:
+                engine.close()
+        if reference is None:
+            reference = (statistics.median(times), dist)
+        results.append({
+            'n': graph.n,
+            'm': graph.m,
+            'workers': count,
+            'median_ms': statistics.median(times) / 1e6,
+            'speedup': reference[0] / statistics.median(times),
+            'agrees': dist == reference[1],
+        })
+    return results
+
+# Median times of the replay of a trace (heap_trace.Trace) on each backend spec, timed in shuffled rounds like run.
+# Each heap is created once and reset before every replay, so only the heap operations are timed.
+def replay_times(trace, specs, repeat=5, warmup=1, seed=0):
+    import backends
+    import heap_trace
+    heaps = {spec: backends.create(spec, trace.n, trace.C) for spec in specs}
+    samples = {spec: [] for spec in specs}
+    for spec in specs:
+        for _ in range(warmup):
+            heaps[spec].reset()
+            heap_trace.replay(trace, heaps[spec])
+
+    order = list(specs)
+    rand = random.Random(seed)
+    for _ in range(repeat):
+        rand.shuffle(order)
+        for spec in order:
+            heaps[spec].reset()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter_ns()
+                heap_trace.replay(trace, heaps[spec])
+                samples[spec].append(time.perf_counter_ns() - start)
+            finally:
+                gc.enable()
+
+    results = []
+    for spec in specs:
+        times = sorted(samples[spec])
+        results.append({
+            'backend': spec,
+            'repeat': repeat,
+            'median_ms': statistics.median(times) / 1e6,
+            'min_ms': times[0] / 1e6,
+            'ns_per_op': statistics.median(times) / max(len(trace), 1),
+        })
+    return results
+
+def print_replay(results):
+    print('Trace replay: [backend] : [median ms] [min ms] [ns per operation]')
+    for result in results:
+        print('---------------------------')
+        print(result['backend'], ':', '%.3f' % result['median_ms'], '%.3f' % result['min_ms'], '%.1f' % result['ns_per_op'])
+
+def print_scaling(results):
+    print('Delta-stepping scaling: [n] [m] [workers] : [median ms] [speedup over the first row of n]')
+    for result in results:
+        print('---------------------------')
+        print(result['n'], result['m'], result['workers'], ':', '%.3f' % result['median_ms'], '%.2fx' % result['speedup'],
+              '' if result['agrees'] else '(MISMATCH)')
+
+def print_overhead(results):
+    print('Predecessor recording: [data structure] : [median ms] [median ms with predecessors] [overhead %]')
+    for result in results:
+        print('---------------------------')
+        print(result['backend'], ':', '%.3f' % result['plain_ms'], '%.3f' % result['recording_ms'], '%+.1f%%' % result['overhead_pct'])
+
+def _timed(graph, src, level, **options):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        dist = solve(graph, src, level, **options)
+        elapsed = time.perf_counter_ns() - start
+    finally:
+        gc.enable()
+    return elapsed, dist
+
+def _peak_memory(graph, src, level):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        solve(graph, src, level)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Nearest rank percentile of sorted samples
+def _percentile(times, p):
+    rank = max(1, -(-len(times) * p // 100))
+    return times[rank - 1]
+
+# The backends mark unreachable nodes differently (sys.maxsize or n * C + 1), map both to None
+def _normalize(graph, dist):
+    limit = graph.n * graph.C
+    return [d if d <= limit else None for d in dist]
+
+def metadata(graph, path=None, label=None):
+    return {
+        'input': path,
+        'label': label,
+        'n': graph.n,
+        'm': graph.m,
+        'C': graph.C,
+        'python': platform.python_version(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+# Run each heap backend once with operation counters
+def collect_stats(graph, src=0, backends=BACKENDS):
+    results = []
+    for name, level in backends:
+        if level is not None and level != DELTA:
+            stats = HeapStats()
+            solve(graph, src, level, stats=stats)
+            results.append((name, stats))
+    return results
+
+def print_stats(results):
+    print('Heap operation counters')
+    for name, stats in results:
+        print('---------------------------')
+        print(name, ':', ', '.join('%s=%s' % item for item in stats.as_dict().items()))
+
+def print_results(results):
+    print('Output format: [data structure] : [median ms] [p95 ms] [peak KiB] [n] [distance]')
+    for result in results:
+        print('---------------------------')
+        peak = '-' if result['peak_kib'] is None else '%.1f' % result['peak_kib']
+        print(result['backend'], ':', '%.3f' % result['median_ms'], '%.3f' % result['p95_ms'], peak,
+              result['n'], result['distance'], '' if result['agrees'] else '(MISMATCH)')
+
+def write_json(results, path, meta):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+# One row per backend, the metadata is repeated on every row so that files of several runs can be concatenated
+def write_csv(results, path, meta, fields=FIELDS):
+    meta_fields = sorted(field for field in meta if field not in fields)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=meta_fields + fields)
+        writer.writeheader()
+        for result in results:
+            row = dict(meta)
+            row.update(result)
+            writer.writerow(row)
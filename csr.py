@@ -0,0 +1,46 @@
+from array import array
+from collections import Counter
+from itertools import accumulate, repeat
+from operator import sub
+
+'''
+Compressed sparse row (CSR) layout of a graph.
+
+The arcs leaving node u are the slice offsets[u]:offsets[u + 1] of the parallel arrays targets and weights.
+Every array holds 64 bit integers, so the whole graph takes 8 * (n + 1 + 2m) bytes
+and the relaxation loop reads plain integers instead of (child, distance) tuples.
+'''
+
+def from_adjacents(n, adjacents):
+    # Convert a list of lists of (child, distance) tuples
+    offsets = array('q', [0]) * (n + 1)
+    targets = array('q')
+    weights = array('q')
+    for u in range(n):
+        edges = adjacents[u] if u < len(adjacents) else ()
+        for child, distance in edges:
+            targets.append(child)
+            weights.append(distance)
+        offsets[u + 1] = len(targets)
+    return offsets, targets, weights
+
+def from_arcs(n, sources, targets, weights, base=0):
+    # Build the layout from parallel arc arrays by a stable sort on the source node,
+    # the arcs of a node keep their input order. Node ids are shifted by base (1 for DIMACS ids).
+    counts = Counter(sources)
+    offsets = array('q', accumulate(map(counts.__getitem__, range(base, n + base)), initial=0))
+    order = sorted(range(len(sources)), key=sources.__getitem__)
+    csr_targets = array('q', map(sub, map(targets.__getitem__, order), repeat(base)))
+    csr_weights = array('q', map(weights.__getitem__, order))
+    return offsets, csr_targets, csr_weights
+
+def as_array(values):
+    # Keep typed arrays and memory views as they are (no copy), view contiguous 64 bit buffers
+    # such as NumPy int64 arrays in place, and copy anything else into an array('q')
+    if isinstance(values, (array, memoryview)):
+        return values
+    if hasattr(values, '__array_interface__'):
+        view = memoryview(values)
+        if view.c_contiguous and view.itemsize == 8 and view.format in ('q', 'l'):
+            return view.cast('B').cast('q')
+    return array('q', values)
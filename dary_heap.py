@@ -0,0 +1,161 @@
+from array import array
+
+'''
+An class of indexed d-ary heap for supervising labeled nodes.
+
+It provides the three heap operations as follows.
+ * insert(label, d): Insert the labeled node to the heap with its label and distance.
+ * decrease(label, d): Pick up the already inserted node from the heap and insert again according to a new distance.
+ * delete_min(): Extract the node which has a minimum distance to make it scanned.
+
+It overrides ``__len__``, that provides whether heap is empty or not.
+A batch of labeled nodes (e.g. the sources of a multi source search) is inserted in one pass with insert_many(labels, dists).
+reset(stats) empties the heap for another search in constant time, without allocating.
+
+The heap is stored as two flat arrays, the keys and the labels of the positions, where the children of
+the position i are D * i + 1, ..., D * i + D. A position map indexed by label makes decrease a sift up
+from the current position of the node, so every node is in the heap at most once (no lazy deletion).
+Unlike the radix heaps it does not depend on C and accepts any order of distances.
+
+Time complexity: O(m log_D n + n D log_D n)
+m: the number of edges
+n: the number of nodes
+
+'''
+class DaryHeap():
+
+  def __init__(self, n, C, D=4, debug=False, stats=None):
+
+    self.n = n
+    self.C = C
+    # The number of children of a position
+    self.D = D
+    # Keys and labels of the heap positions
+    self.keys = array('q', [0]) * self.n
+    self.labels = array('q', [-1]) * self.n
+    # Look up table for each node: its position in the heap (-1 if not in the heap)
+    self.positions = array('q', [-1]) * self.n
+    # The number of labeled nodes in the heap
+    self.len = 0
+    self.debug = debug
+    # Operation counters (heap_stats.HeapStats), None when they are disabled
+    self.stats = stats
+
+  # Empty the heap for a new search, stats replaces the operation counters. The nodes left by a search
+  # that stopped early keep a stale position, which is only read for nodes in the heap
+  def reset(self, stats=None):
+    self.len = 0
+    self.stats = stats
+
+  def insert(self, label, d):
+    self.len += 1
+    self._sift_up(self.len - 1, label, d)
+    if self.stats is not None:
+      self.stats.inserted(self.len)
+    if self.debug:
+      self.print_heap('insert label : %s, distance: %s' % (label, d))
+
+  # Append the batch to the positions and restore the heap order bottom up (Floyd), O(k) for k new nodes in an empty heap
+  def insert_many(self, labels, dists):
+    if self.len > 0 and len(labels) < self.len:
+      for label, d in zip(labels, dists):
+        self.len += 1
+        self._sift_up(self.len - 1, label, d)
+    else:
+      for label, d in zip(labels, dists):
+        self.keys[self.len] = d
+        self.labels[self.len] = label
+        self.positions[label] = self.len
+        self.len += 1
+      for i in range((self.len - 2) // self.D, -1, -1):
+        self._sift_down(i, self.labels[i], self.keys[i])
+    if self.stats is not None:
+      self.stats.inserted(self.len, len(labels))
+    if self.debug:
+      self.print_heap('insert %s labels' % len(labels))
+
+  def decrease(self, label, d):
+    self._sift_up(self.positions[label], label, d)
+    if self.stats is not None:
+      self.stats.decreases += 1
+    if self.debug:
+      self.print_heap('decrease label: %s, distance: %s' % (label, d))
+
+  # Take the root and move the last position down from the root
+  def delete_min(self):
+    self.len -= 1
+    min_label = self.labels[0]
+    min_key = self.keys[0]
+    self.positions[min_label] = -1
+    if self.len > 0:
+      self._sift_down(0, self.labels[self.len], self.keys[self.len])
+    if self.stats is not None:
+      self.stats.delete_mins += 1
+    if self.debug:
+      self.print_heap('delete min label: %s, distance: %s' % (min_label, min_key))
+    return (min_label, min_key)
+
+  # Move the parents down until the key fits, then place the label at the free position
+  def _sift_up(self, i, label, d):
+    keys = self.keys
+    labels = self.labels
+    positions = self.positions
+    steps = 0
+    while i > 0:
+      parent = (i - 1) // self.D
+      if keys[parent] <= d:
+        break
+      keys[i] = keys[parent]
+      labels[i] = labels[parent]
+      positions[labels[i]] = i
+      i = parent
+      steps += 1
+    keys[i] = d
+    labels[i] = label
+    positions[label] = i
+    if self.stats is not None:
+      self.stats.insert_scans += steps + 1
+
+  # Move the smallest children up until the key fits, then place the label at the free position
+  def _sift_down(self, i, label, d):
+    keys = self.keys
+    labels = self.labels
+    positions = self.positions
+    size = self.len
+    steps = 0
+    while True:
+      first = i * self.D + 1
+      if first >= size:
+        break
+      last = min(first + self.D, size)
+      child_key = min(keys[first:last])
+      if child_key >= d:
+        break
+      child = keys.index(child_key, first, last)
+      keys[i] = child_key
+      labels[i] = labels[child]
+      positions[labels[i]] = i
+      i = child
+      steps += 1
+    keys[i] = d
+    labels[i] = label
+    positions[label] = i
+    if self.stats is not None:
+      self.stats.delete_min_scans += steps + 1
+
+  def __len__(self):
+    return self.len
+
+  def print_heap(self, op_name):
+    title_str = '* ------ Operation: %s ------- *' % op_name
+    print('\n' + title_str)
+    print('\n Heap states (D: %s) : ' % self.D)
+    first = 0
+    level = 0
+    while first < self.len:
+      last = min(first * self.D + 1, self.len)
+      print(' ' + str(level) + ' ' + str([(self.labels[i], self.keys[i]) for i in range(first, last)]))
+      first = last
+      level += 1
+
+    print ('\n* ' + '-' * (len(title_str) - 4) + ' *')
@@ -0,0 +1,240 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Delta-stepping single source shortest paths with NumPy (Meyer and Sanders).
+
+The tentative distances are grouped into buckets of width delta and a whole bucket is processed at once.
+The arcs of weight at most delta (light arcs) of the nodes in the bucket are relaxed together with gathers over
+the CSR arrays and np.minimum.at, repeating while the relaxations put nodes back into the bucket.
+The heavy arcs of all the nodes removed from the bucket are relaxed once afterwards, since they can not
+reach the same bucket. The arcs are split into a light and a heavy CSR once per delta and kept on the graph.
+With predecessors, the source of every candidate that wins the min-reduction of a node becomes its predecessor.
+The buckets are filled from the nodes each relaxation improves, so a phase costs the arcs it relaxes
+and not a scan of all n distances. A node that moves to a lower bucket leaves a stale entry in its old bucket,
+dropped when that bucket is taken.
+
+A larger delta means fewer buckets (fewer NumPy calls) but more relaxations of nodes whose distance is not final yet.
+
+ParallelDeltaStepping runs the same phases with the relaxations of large frontiers split across worker processes.
+'''
+
+# The light and heavy arcs of a graph for delta, as (offsets, targets, weights) each
+def split_arcs(graph, delta):
+    if graph.delta_arcs is not None and graph.delta_arcs[0] == delta:
+        return graph.delta_arcs[1], graph.delta_arcs[2]
+
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    weights = np.asarray(graph.weights, dtype=np.int64)
+    sources = np.repeat(np.arange(graph.n, dtype=np.int64), np.diff(offsets))
+    light = weights <= delta
+    arcs = []
+    for mask in (light, ~light):
+        part_offsets = np.zeros(graph.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[mask], minlength=graph.n), out=part_offsets[1:])
+        arcs.append((part_offsets, targets[mask], weights[mask]))
+    graph.delta_arcs = (delta, arcs[0], arcs[1])
+    return arcs[0], arcs[1]
+
+# The relaxations of the arcs (offsets, targets, weights) leaving the nodes that improve dist,
+# as (heads, distances, tails), tails is None unless it is asked for
+def _candidates(dist, nodes, offsets, targets, weights, tails=False):
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    # The position of every arc of the nodes in the CSR arrays
+    firsts = np.cumsum(counts) - counts
+    arcs = np.arange(total, dtype=np.int64) + np.repeat(starts - firsts, counts)
+    heads = targets[arcs]
+    candidates = np.repeat(dist[nodes], counts) + weights[arcs]
+    better = candidates < dist[heads]
+    return heads[better], candidates[better], np.repeat(nodes, counts)[better] if tails else None
+
+# Relax the arcs leaving the nodes, return the nodes whose distance decreased.
+# The predecessors are recorded in pred if it is given
+def _relax(dist, nodes, arcs, pred=None):
+    heads, candidates, tails = _candidates(dist, nodes, *arcs, tails=pred is not None)
+    np.minimum.at(dist, heads, candidates)
+    if pred is not None:
+        _record(dist, pred, heads, candidates, tails)
+    return np.unique(heads)
+
+# Every candidate improved its node, so one equal to the distance after the min-reduction gives a predecessor
+def _record(dist, pred, heads, candidates, tails):
+    won = candidates == dist[heads]
+    pred[heads[won]] = tails[won]
+
+# A predecessor array of path_tree and a NumPy view of it
+def _predecessors(n):
+    import path_tree
+    pred = path_tree.predecessor_array(n)
+    return pred, np.frombuffer(pred, dtype=np.int32 if pred.typecode == 'i' else np.int64)
+
+# Half of the largest weight: with delta = C * n / m, the choice for sequential work, the dense graphs get
+# a bucket for every couple of distance units and the NumPy calls per bucket dominate
+def default_delta(graph):
+    return max(1, (graph.C + 1) // 2)
+
+# Distances from src as a list, n * C + 1 for unreachable nodes.
+# With predecessors=True it returns (dist, pred), pred is the predecessor array of path_tree
+def solve(graph, src, delta=None, predecessors=False):
+    delta = default_delta(graph) if delta is None else delta
+    light, heavy = split_arcs(graph, delta)
+    dist = np.full(graph.n, graph.n * graph.C + 1, dtype=np.int64)
+    pred, pred_view = _predecessors(graph.n) if predecessors else (None, None)
+    _search(graph, src, delta, dist, lambda nodes, is_light: _relax(dist, nodes, light if is_light else heavy, pred_view))
+    if pred is not None:
+        return dist.tolist(), pred
+    return dist.tolist()
+
+# The bucket phases on dist (filled with n * C + 1), relax(nodes, is_light) relaxes the light or heavy arcs of the nodes
+def _search(graph, src, delta, dist, relax):
+    dist[src] = 0
+    # Nodes of the buckets that are already processed
+    done = np.zeros(graph.n, dtype=bool)
+    # bucket index -> arrays of the nodes put into the bucket, and a heap of the indices of the buckets
+    buckets = {}
+    indices = []
+    _fill(buckets, indices, np.array([src], dtype=np.int64), dist, delta)
+
+    while indices:
+        index = heapq.heappop(indices)
+        frontier = np.concatenate(buckets.pop(index))
+        # Drop the nodes that moved to a lower bucket since they were put into this one
+        frontier = np.unique(frontier[~done[frontier] & (dist[frontier] // delta == index)])
+        upper = (index + 1) * delta
+        removed = []
+        while frontier.size > 0:
+            removed.append(frontier)
+            changed = relax(frontier, True)
+            inside = dist[changed] < upper
+            _fill(buckets, indices, changed[~inside], dist, delta)
+            frontier = changed[inside]
+        if removed:
+            removed = np.unique(np.concatenate(removed))
+            done[removed] = True
+            # A heavy arc leads past the bucket
+            _fill(buckets, indices, relax(removed, False), dist, delta)
+
+# Put the nodes into the buckets of their distances
+def _fill(buckets, indices, nodes, dist, delta):
+    if nodes.size == 0:
+        return
+    keys = dist[nodes] // delta
+    if keys.min() == keys.max():
+        parts = [(int(keys[0]), nodes)]
+    else:
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        nodes = nodes[order]
+        bounds = [0] + (np.flatnonzero(keys[1:] != keys[:-1]) + 1).tolist() + [nodes.size]
+        parts = [(int(keys[start]), nodes[start:end]) for start, end in zip(bounds, bounds[1:])]
+    for index, part in parts:
+        if index not in buckets:
+            buckets[index] = []
+            heapq.heappush(indices, index)
+        buckets[index].append(part)
+
+# Delta-stepping whose large relaxation phases are split across a pool of worker processes.
+# The workers map the arcs (parallel.SharedGraph) and the distance array from shared memory. Each one
+# computes the improving relaxations of a part of the frontier, reduces them to the minimum per node
+# (with its source when predecessors are recorded) and sends them back, and the parent merges them into
+# the distances with a min-reduction (np.minimum.at) before the next phase.
+# Phases with fewer than min_arcs arcs are relaxed in the parent.
+# The pool and the shared blocks are kept until close(), so one instance serves many sources.
+class ParallelDeltaStepping():
+    def __init__(self, graph, workers, delta=None, min_arcs=100000):
+        import parallel
+        self.graph = graph
+        self.workers = workers
+        self.delta = default_delta(graph) if delta is None else delta
+        self.min_arcs = min_arcs
+        self.light, self.heavy = split_arcs(graph, self.delta)
+        self.shared = parallel.SharedGraph(graph)
+        self.dist_shm = shared_memory.SharedMemory(create=True, size=8 * max(graph.n, 1))
+        self.dist = np.ndarray(graph.n, dtype=np.int64, buffer=self.dist_shm.buf)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(self.shared.name, self.dist_shm.name, self.delta))
+        # NumPy view of the predecessors of the running search, None when they are not recorded
+        self.pred = None
+
+    # Distances from src as a list, n * C + 1 for unreachable nodes.
+    # With predecessors=True it returns (dist, pred), pred is the predecessor array of path_tree
+    def solve(self, src, predecessors=False):
+        self.dist.fill(self.graph.n * self.graph.C + 1)
+        pred, self.pred = _predecessors(self.graph.n) if predecessors else (None, None)
+        try:
+            _search(self.graph, src, self.delta, self.dist, self._relax)
+        finally:
+            self.pred = None
+        if pred is not None:
+            return self.dist.tolist(), pred
+        return self.dist.tolist()
+
+    def _relax(self, nodes, is_light):
+        offsets = self.light[0] if is_light else self.heavy[0]
+        counts = offsets[nodes + 1] - offsets[nodes]
+        cumulative = np.cumsum(counts)
+        total = int(cumulative[-1])
+        if self.workers == 1 or total < self.min_arcs:
+            return _relax(self.dist, nodes, self.light if is_light else self.heavy, self.pred)
+
+        # Parts of the frontier with about the same number of arcs
+        bounds = np.searchsorted(cumulative, total * np.arange(1, self.workers) // self.workers)
+        tails = self.pred is not None
+        futures = [self.pool.submit(_worker_candidates, part, is_light, tails) for part in np.split(nodes, bounds) if part.size > 0]
+        results = [future.result() for future in futures]
+        heads = np.concatenate([heads for heads, _, _ in results])
+        candidates = np.concatenate([candidates for _, candidates, _ in results])
+        np.minimum.at(self.dist, heads, candidates)
+        if tails:
+            _record(self.dist, self.pred, heads, candidates, np.concatenate([tails for _, _, tails in results]))
+        return np.unique(heads)
+
+    def close(self):
+        self.pool.shutdown()
+        self.shared.close()
+        # The array must not use the block when it is closed
+        self.dist = None
+        self.dist_shm.close()
+        self.dist_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# State of a worker process: (shared blocks, distances, light arcs, heavy arcs)
+_worker = None
+
+def _init_worker(graph_name, dist_name, delta):
+    global _worker
+    import parallel
+    graph_shm, graph = parallel.attach(graph_name)
+    dist_shm = shared_memory.SharedMemory(name=dist_name)
+    light, heavy = split_arcs(graph, delta)
+    _worker = ((graph_shm, dist_shm), np.ndarray(graph.n, dtype=np.int64, buffer=dist_shm.buf), light, heavy)
+
+# The improving relaxations of a part of the frontier, reduced to the smallest candidate per node,
+# with the source of that candidate when tails is set
+def _worker_candidates(nodes, is_light, tails=False):
+    _, dist, light, heavy = _worker
+    heads, candidates, sources = _candidates(dist, nodes, *(light if is_light else heavy), tails=tails)
+    if heads.size == 0:
+        return heads, candidates, sources
+    if not tails:
+        order = np.argsort(heads, kind='stable')
+        heads, firsts = np.unique(heads[order], return_index=True)
+        return heads, np.minimum.reduceat(candidates[order], firsts), None
+    # Sorted by node then candidate, the first entry of a node holds its smallest candidate
+    order = np.lexsort((candidates, heads))
+    heads, firsts = np.unique(heads[order], return_index=True)
+    return heads, candidates[order][firsts], sources[order][firsts]
@@ -1,20 +1,64 @@
 import sys
 import heapq
-from radix_heap import RadixHeap
-from radix_heap_2 import RadixHeap2
-from f_heap import FibonacciHeap
-from heap import Heap
+import csr
+import backends
+import path_tree
+from array import array
+from itertools import repeat
 
 class Graph():
-    def __init__(self, n, C, adjacents):
+    # The arcs are given either as adjacency lists of (child, distance) tuples
+    # or as a CSR layout (offsets, targets, weights), which is used internally
+    def __init__(self, n, C, adjacents=None, offsets=None, targets=None, weights=None):
         self.n = n
         self.C = C
-        self.adjacents = adjacents
+        if adjacents is not None:
+            offsets, targets, weights = csr.from_adjacents(n, adjacents)
+        self.offsets = csr.as_array(offsets)
+        self.targets = csr.as_array(targets)
+        self.weights = csr.as_array(weights)
+        self.m = len(self.targets)
+        # The graph with every arc reversed, built on the first use
+        self.reversed_graph = None
+        # (delta, light arcs, heavy arcs) kept by delta_stepping for the last delta
+        self.delta_arcs = None
+        # In-arcs with the index of each arc in the forward arrays, built by dynamic.in_arcs on the first repair
+        self.in_arcs = None
+        # Shortest path trees kept up to date by update_edges: source -> (path_tree.ShortestPathTree, backend)
+        self.trees = {}
+        # Increased by every change of the arcs, caches compare it to drop their stale results
+        self.version = 0
+        # distance_cache.DistanceCache used by distances(), None until cache_distances is called
+        self.distance_cache = None
+        # The workspace.QueryWorkspace of each backend and key bound C (None for the distances, larger for the
+        # A* and repair keys), replaced when a search asks for other parameters: (backend name, C) -> (params, workspace)
+        self.workspaces = {}
+
+    # The graph with every arc reversed (kept for later calls)
+    def reverse(self):
+        if self.reversed_graph is None:
+            offsets, targets, weights = self._reversed_arcs(self.weights)
+            self.reversed_graph = Graph(self.n, self.C, offsets=offsets, targets=targets, weights=weights)
+            self.reversed_graph.reversed_graph = self
+        return self.reversed_graph
+
+    # CSR of the reversed arcs, values holds a value per forward arc
+    def _reversed_arcs(self, values):
+        offsets = self.offsets
+        sources = array('q')
+        for u in range(self.n):
+            sources.extend(repeat(u, offsets[u + 1] - offsets[u]))
+        return csr.from_arcs(self.n, self.targets, sources, values)
 
     # O(mlogn) Implementation
-    def dijkstra_naive(self, src):
+    # With predecessors=True it returns (dist, pred), pred is the predecessor array of path_tree
+    def dijkstra_naive(self, src, predecessors=False):
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
         dist = [sys.maxsize] * self.n
         dist[src] = 0
+        pred = path_tree.predecessor_array(self.n) if predecessors else None
         h = []
         heapq.heappush(h, (0, src))
 
@@ -24,25 +68,61 @@ class Graph():
             if dist[u] < top_vertex[0]:
                 continue
 
-            for edge in self.adjacents[u]:
-                weight = edge[1]
-                v = edge[0]
+            start = offsets[u]
+            end = offsets[u + 1]
+            for v, weight in zip(targets[start:end], weights[start:end]):
                 if dist[v] > dist[u] + weight:
                     dist[v] = dist[u] + weight
                     heapq.heappush(h, (dist[v], v))
+                    if pred is not None:
+                        pred[v] = u
 
+        if pred is not None:
+            return dist, pred
         return dist
-    
-    def dijkstra_radix(self, src, level='One Level', debug=False):
-        radixheap = None
-        if level == 'One Level':
-            radixheap = RadixHeap(self.n, self.C, debug=debug)
-        elif level == 'Two level':
-            radixheap = RadixHeap2(self.n, self.C, 4, debug=debug)
+
+    # Delta-stepping with NumPy (see delta_stepping.py), delta defaults to about C / 2.
+    # With workers > 1 the large relaxation phases are split across a pool of processes
+    # (delta_stepping.ParallelDeltaStepping keeps the pool for many sources).
+    # Returns the same distances as dijkstra_radix, and runs dijkstra_radix when NumPy is not installed
+    # With predecessors=True it returns (dist, pred), pred is the predecessor array of path_tree
+    def dijkstra_delta(self, src, delta=None, workers=1, predecessors=False):
+        import delta_stepping
+        if delta_stepping.np is None:
+            return self.dijkstra_radix(src, predecessors=predecessors)
+        if workers > 1:
+            with delta_stepping.ParallelDeltaStepping(self, workers, delta) as engine:
+                return engine.solve(src, predecessors=predecessors)
+        return delta_stepping.solve(self, src, delta, predecessors=predecessors)
+
+    # Distances from many sources computed by a pool of worker processes that share the arcs
+    # through shared memory. Yields (source, distances as array('q')) in the order the searches finish.
+    # backend is a level of dijkstra_radix or 'heapq', workers defaults to the number of CPUs.
+    def dijkstra_many(self, sources, backend='One Level', workers=None):
+        import parallel
+        return parallel.dijkstra_many(self, sources, level=backend, workers=workers)
+
+    # level is a backend spec of the backends module ('auto' chooses one from n, m and C),
+    # params override the parameters of the backend (e.g. K=8 for 'Two level').
+    # The operation counters of the heap are collected in stats (heap_stats.HeapStats) if it is given.
+    # With predecessors=True it returns (dist, pred), pred is the predecessor array of path_tree
+    # The heap of the workspace of the backend is reused, only the returned lists are allocated,
+    # with reuse=False the search builds its own heap (the benchmarks time and measure the whole search).
+    # The heap operations are appended to trace (heap_trace.Trace) if it is given.
+    def dijkstra_radix(self, src, level='One Level', debug=False, stats=None, predecessors=False, trace=None, reuse=True, **params):
+        if debug or not reuse:
+            radixheap = self._make_heap(level, debug=debug, stats=stats, **params)
         else:
-            radixheap = FibonacciHeap(self.n, self.C, 4, debug=debug)
+            radixheap = self._reused_heap(level, stats=stats, **params)
+        if trace is not None:
+            import heap_trace
+            radixheap = heap_trace.TracingHeap(radixheap, trace)
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
         dist = [self.n * self.C + 1] * self.n
         dist[src] = 0
+        pred = path_tree.predecessor_array(self.n) if predecessors else None
         radixheap.insert(src, dist[src])
 
         while len(radixheap) > 0:
@@ -51,9 +131,9 @@ class Graph():
             if dist[u] < top_vertex[1]:
                 continue
 
-            for edge in self.adjacents[u]:
-                v = edge[0]
-                weight = edge[1]
+            start = offsets[u]
+            end = offsets[u + 1]
+            for v, weight in zip(targets[start:end], weights[start:end]):
                 if dist[v] > dist[u] + weight:
                     if dist[v] == self.n * self.C + 1:
                         dist[v] = dist[u] + weight
@@ -61,5 +141,185 @@ class Graph():
                     else:
                         dist[v] = dist[u] + weight
                         radixheap.decrease(v, dist[v])
-      
+                    if pred is not None:
+                        pred[v] = u
+
+        if pred is not None:
+            return dist, pred
         return dist
+
+    # The shortest path tree from src (path_tree.ShortestPathTree), backend is a level of dijkstra_radix, 'heapq' or 'delta'
+    def shortest_path_tree(self, src, backend='One Level'):
+        if backend == 'heapq':
+            dist, pred = self.dijkstra_naive(src, predecessors=True)
+            return path_tree.ShortestPathTree(src, dist, pred, sys.maxsize)
+        if backend == 'delta':
+            dist, pred = self.dijkstra_delta(src, predecessors=True)
+        else:
+            dist, pred = self.dijkstra_radix(src, level=backend, predecessors=True)
+        return path_tree.ShortestPathTree(src, dist, pred, self.n * self.C + 1)
+
+    # Keep the distance arrays returned by distances() in an LRU cache of at most budget bytes,
+    # evicted arrays are written to spill_path (memory mapped when they are read back) if it is given
+    def cache_distances(self, budget=64 * 1024 * 1024, spill_path=None, backend='One Level'):
+        import distance_cache
+        if self.distance_cache is not None:
+            self.distance_cache.close()
+        self.distance_cache = distance_cache.DistanceCache(self, budget, spill_path, backend)
+        return self.distance_cache
+
+    # Distances from src, as a read only memory view from the cache when cache_distances was called
+    def distances(self, src, backend='One Level'):
+        if self.distance_cache is not None:
+            return self.distance_cache.get(src)
+        return self.dijkstra_radix(src, level=backend)
+
+    # All pairs distances written row by row into a memory mapped matrix file (distance_matrix.py), 32 bit while
+    # n * C + 1 fits unless typecode is given. An existing file of this graph is resumed: only the missing rows are computed.
+    # With workers > 1 the rows are computed on a process pool. Returns the distance_matrix.DistanceMatrix open for writing
+    def all_pairs(self, path, backend='One Level', workers=1, typecode=None):
+        import distance_matrix
+        return distance_matrix.compute(self, path, backend=backend, workers=workers, typecode=typecode)
+
+    # Compute the shortest path tree from src and keep it up to date when arc weights change (update_edges).
+    # The returned path_tree.ShortestPathTree is updated in place. Dial can not be used (see dynamic.py)
+    def track(self, src, backend='One Level'):
+        import dynamic
+        backend = dynamic.check_backend(self, backend)
+        dist, pred = self.dijkstra_radix(src, level=backend, predecessors=True)
+        tree = path_tree.ShortestPathTree(src, dist, pred, self.n * self.C + 1)
+        self.trees[src] = (tree, backend)
+        return tree
+
+    def untrack(self, src):
+        del self.trees[src]
+
+    def update_edge(self, u, v, w):
+        return self.update_edges([(u, v, w)])
+
+    # Set the weight of the arcs u -> v to w for each (u, v, w) and repair the tracked trees.
+    # Read only weights (a memory mapped cache) are copied first. A weight above C raises C,
+    # which changes the heaps and the unreachable distance, so the trees are then computed again.
+    # Returns the number of nodes extracted by the repairs.
+    def update_edges(self, updates):
+        if isinstance(self.weights, memoryview) and self.weights.readonly:
+            self.weights = array('q', self.weights.tobytes())
+        # arc index -> (u, v, weight before the batch), an arc updated twice keeps its first old weight
+        updated = {}
+        for u, v, w in updates:
+            if w < 0:
+                raise ValueError('negative weight %s on the arc %s -> %s' % (w, u, v))
+            found = False
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                if self.targets[i] == v:
+                    found = True
+                    updated.setdefault(i, (u, v, self.weights[i]))
+                    self.weights[i] = w
+            if not found:
+                raise KeyError('no arc %s -> %s' % (u, v))
+        changes = [(u, v, old, self.weights[i]) for i, (u, v, old) in updated.items() if self.weights[i] != old]
+        if not changes:
+            return 0
+
+        # The reversed graph and the delta-stepping arcs hold copies of the weights
+        self.version += 1
+        self.reversed_graph = None
+        self.delta_arcs = None
+        extracted = 0
+        if max(new for _, _, _, new in changes) > self.C:
+            self.C = max(new for _, _, _, new in changes)
+            self.workspaces = {}
+            for src, (tree, backend) in self.trees.items():
+                tree.dist, tree.pred = self.dijkstra_radix(src, level=backend, predecessors=True)
+                tree.inf = self.n * self.C + 1
+                extracted += self.n
+            return extracted
+
+        import dynamic
+        for tree, backend in self.trees.values():
+            extracted += dynamic.repair(self, tree, changes, backend)
+        return extracted
+
+    # C can be raised for searches whose keys are not plain distances
+    def _make_heap(self, level='One Level', debug=False, stats=None, C=None, **params):
+        C = self.C if C is None else C
+        if level == 'auto':
+            level = backends.choose(self.n, self.m, self.C)
+        return backends.create(level, self.n, C, debug=debug, stats=stats, **params)
+
+    # The workspace.QueryWorkspace of the backend, kept for the later searches. Its searches do not allocate
+    # anything of size n: the heap is reset and the distances are stamped with the generation of the search.
+    # One workspace is kept per backend and C, a search with other parameters (e.g. another K) replaces it
+    def workspace(self, backend='One Level', C=None, **params):
+        import workspace
+        if backend == 'auto':
+            backend = backends.choose(self.n, self.m, self.C)
+        name, spec_params = backends.parse(backend)
+        spec_params.update(params)
+        spec = tuple(sorted(spec_params.items()))
+        kept = self.workspaces.get((name, C))
+        if kept is None or kept[0] != spec:
+            kept = self.workspaces[(name, C)] = (spec, workspace.QueryWorkspace(self, name, C=C, **spec_params))
+        return kept[1]
+
+    # The heap of the workspace of the backend, emptied for a new search
+    def _reused_heap(self, level='One Level', stats=None, C=None, **params):
+        heap = self.workspace(level, C=C, **params).heap
+        heap.reset(stats)
+        return heap
+
+    # Distance from s to t, n * C + 1 if t is not reachable.
+    # The search stops as soon as t is extracted from the heap. With bidirectional=True a forward search from s
+    # and a backward search from t on the reversed graph run alternately, each one with its own heap.
+    # With landmarks (alt.Landmarks of this graph) it runs an A* search guided by the landmark distances.
+    # The one directional search runs in the workspace of the backend, so it allocates nothing of size n.
+    def shortest_path(self, s, t, backend='One Level', bidirectional=False, stats=None, landmarks=None):
+        if landmarks is not None:
+            return landmarks.shortest_path(self, s, t, backend, stats)
+        if bidirectional:
+            return self._bidirectional_path(s, t, backend, stats)
+        return self.workspace(backend).shortest_path(s, t, stats)
+
+    # The searches stop when a node is extracted by both of them. The answer is then the best dist_f[v] + dist_b[v]
+    # seen while relaxing, which covers every path through an arc between the two settled regions.
+    def _bidirectional_path(self, s, t, backend, stats):
+        inf = self.n * self.C + 1
+        if s == t:
+            return 0
+
+        # (graph, heap, own distances, other distances, own settled flags, other settled flags)
+        forward_dist = [inf] * self.n
+        backward_dist = [inf] * self.n
+        forward_settled = bytearray(self.n)
+        backward_settled = bytearray(self.n)
+        forward = (self, self._reused_heap(backend, stats=stats), forward_dist, backward_dist, forward_settled, backward_settled)
+        backward = (self.reverse(), self.reverse()._reused_heap(backend, stats=stats), backward_dist, forward_dist, backward_settled, forward_settled)
+        forward_dist[s] = 0
+        forward[1].insert(s, 0)
+        backward_dist[t] = 0
+        backward[1].insert(t, 0)
+        best = inf
+
+        while len(forward[1]) > 0 and len(backward[1]) > 0:
+            # Expand the side with the smaller heap
+            graph, radixheap, dist, other_dist, settled, other_settled = forward if len(forward[1]) <= len(backward[1]) else backward
+            u, d = radixheap.delete_min()
+            settled[u] = 1
+            if other_settled[u]:
+                break
+
+            offsets = graph.offsets
+            start = offsets[u]
+            end = offsets[u + 1]
+            for v, weight in zip(graph.targets[start:end], graph.weights[start:end]):
+                if dist[v] > d + weight:
+                    if dist[v] == inf:
+                        dist[v] = d + weight
+                        radixheap.insert(v, dist[v])
+                    else:
+                        dist[v] = d + weight
+                        radixheap.decrease(v, dist[v])
+                    if other_dist[v] < inf and best > dist[v] + other_dist[v]:
+                        best = dist[v] + other_dist[v]
+
+        return best
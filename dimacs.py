@@ -0,0 +1,85 @@
+import mmap
+import re
+from array import array
+import csr
+import graph_cache
+from dijkstra import Graph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Bulk loader for the shortest path files of the DIMACS implementation challenge
+(http://www.dis.uniroma1.it/challenge9/download.shtml).
+
+ * c [comment]: ignored
+ * p sp [n] [m]: problem line, gives the number of nodes
+ * a [parentNode] [childNode] [distance]: an arc, node ids start from 1
+
+The file is memory mapped and the arc lines are extracted with one regular expression pass,
+parsed in bulk (with NumPy when it is installed) and sorted into the CSR layout by source node.
+load() keeps a binary copy next to the file ([file].rhg, see graph_cache.py) and maps it
+instead of parsing while it is newer than the file.
+'''
+
+# ex) p sp 264346 733846
+PROBLEM_LINE = re.compile(rb'^p[ \t]+\S+[ \t]+(\d+)', re.M)
+# ex) a 1 2 803, captures the numbers after the command
+ARC_LINE = re.compile(rb'^a[ \t]+([^\r\n]*)', re.M)
+
+# Return n, C and the CSR layout (offsets, targets, weights) of the file, node ids are converted to start from 0
+def read(path):
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can not be mapped
+            data = b''
+        # The match points into the map, so n is read before the map is closed
+        problem = PROBLEM_LINE.search(data)
+        n = int(problem.group(1)) if problem else 0
+        arcs = b' '.join(ARC_LINE.findall(data))
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    if np is not None:
+        return _read_numpy(n, arcs)
+
+    values = array('q', map(int, arcs.split()))
+    sources = values[0::3]
+    targets = values[1::3]
+    weights = values[2::3]
+    C = max(weights) if len(weights) > 0 else 0
+    if problem is None and len(sources) > 0:
+        n = max(max(sources), max(targets))
+    return (n, C) + csr.from_arcs(n, sources, targets, weights, base=1)
+
+def _read_numpy(n, arcs):
+    values = np.fromstring(arcs, dtype=np.int64, sep=' ').reshape(-1, 3)
+    sources = values[:, 0] - 1
+    targets = values[:, 1] - 1
+    weights = values[:, 2]
+    C = int(weights.max()) if len(weights) > 0 else 0
+    if n == 0 and len(sources) > 0:
+        n = int(max(sources.max(), targets.max())) + 1
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    order = np.argsort(sources, kind='stable')
+    return n, C, offsets, np.ascontiguousarray(targets[order]), np.ascontiguousarray(weights[order])
+
+def load(path, cache=True):
+    if cache and graph_cache.is_fresh(path):
+        return graph_cache.load(graph_cache.cache_path(path))
+
+    n, C, offsets, targets, weights = read(path)
+    graph = Graph(n, C, offsets=offsets, targets=targets, weights=weights)
+    if cache:
+        try:
+            graph_cache.write(graph_cache.cache_path(path), graph)
+        except OSError:
+            # The cache is an optimization only, e.g. the input directory may be read only
+            pass
+    return graph
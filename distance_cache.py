@@ -0,0 +1,122 @@
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+
+'''
+Cache of the distance arrays of a graph, keyed by the source node.
+
+The distances do not depend on the backend, so an entry computed by any backend serves every later request.
+Entries are stored as typed arrays (32 bit while n * C + 1 fits) and handed out as read only memory views.
+When the entries in memory exceed the budget (in bytes) the least recently used ones are evicted. With a spill
+file they are written to it first, and a later request reads them back through a memory map instead of searching.
+The cache compares the version of the graph, which update_edges increases, before every lookup and drops
+all the entries (and the spill file) when the graph has changed.
+
+Counters: hits, misses, spill_hits, evictions, spills, invalidations.
+'''
+
+class DistanceCache():
+    COUNTERS = ['hits', 'misses', 'spill_hits', 'evictions', 'spills', 'invalidations']
+
+    def __init__(self, graph, budget=64 * 1024 * 1024, spill_path=None, backend='One Level'):
+        self.graph = graph
+        self.budget = budget
+        self.backend = backend
+        self.spill_path = spill_path
+        # source -> distances, in the order of use (least recent first)
+        self.entries = OrderedDict()
+        self.size = 0
+        # source -> (offset, typecode) of the entries written to the spill file
+        self.spilled = {}
+        self.spill_file = None
+        self.spill_map = None
+        self.version = graph.version
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+
+    # Distances from src as a read only memory view, n * C + 1 for unreachable nodes
+    def get(self, src):
+        if self.version != self.graph.version:
+            self.invalidate()
+            self.version = self.graph.version
+
+        if src in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(src)
+            return memoryview(self.entries[src]).toreadonly()
+
+        if src in self.spilled:
+            self.spill_hits += 1
+            dist = self._read_spilled(src)
+        else:
+            self.misses += 1
+            inf = self.graph.n * self.graph.C + 1
+            dist = array('i' if inf < 2 ** 31 else 'q', self.graph.dijkstra_radix(src, level=self.backend))
+        self._store(src, dist)
+        return memoryview(dist).toreadonly()
+
+    def _store(self, src, dist):
+        nbytes = dist.itemsize * len(dist)
+        if nbytes > self.budget:
+            return
+        while self.entries and self.size + nbytes > self.budget:
+            self._evict()
+        self.entries[src] = dist
+        self.size += nbytes
+
+    def _evict(self):
+        src, dist = self.entries.popitem(last=False)
+        self.size -= dist.itemsize * len(dist)
+        self.evictions += 1
+        if self.spill_path is not None and src not in self.spilled:
+            if self.spill_file is None:
+                self.spill_file = open(self.spill_path, 'w+b')
+            self.spill_file.seek(0, os.SEEK_END)
+            self.spilled[src] = (self.spill_file.tell(), dist.typecode)
+            self.spill_file.write(dist.tobytes())
+            self.spill_file.flush()
+            self.spills += 1
+
+    def _read_spilled(self, src):
+        offset, typecode = self.spilled[src]
+        dist = array(typecode)
+        end = offset + dist.itemsize * self.graph.n
+        # Map the file again when it grew past the current map
+        if self.spill_map is None or len(self.spill_map) < end:
+            if self.spill_map is not None:
+                self.spill_map.close()
+            self.spill_map = mmap.mmap(self.spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+        dist.frombytes(self.spill_map[offset:end])
+        return dist
+
+    # Drop every entry, called when the graph changes
+    def invalidate(self):
+        self.entries.clear()
+        self.size = 0
+        self.spilled.clear()
+        if self.spill_map is not None:
+            self.spill_map.close()
+            self.spill_map = None
+        if self.spill_file is not None:
+            self.spill_file.truncate(0)
+        self.invalidations += 1
+
+    def counters(self):
+        return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+    def close(self):
+        self.entries.clear()
+        if self.spill_map is not None:
+            self.spill_map.close()
+            self.spill_map = None
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+            os.remove(self.spill_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,162 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+All pairs distance matrix of a graph, computed row by row into a memory mapped file.
+
+ * header: magic (8 bytes), n, m, C, item size (64 bit integers), digest of the arcs (16 bytes)
+ * done bitmap: a bit per source, set once its row is written (ceil(n / 8) bytes, padded to 8 bytes)
+ * matrix: n rows of n distances, 32 bit integers while n * C + 1 fits and 64 bit otherwise, n * C + 1 for unreachable nodes
+
+Every row is computed by a single source search (several at once on a process pool with workers > 1) and copied
+into the mapped file, so at most a few rows are held in memory whatever the size of the matrix. The bitmap is
+flushed after the rows it marks, and opening an existing file for the same graph computes only the rows that
+are not marked, so an interrupted run resumes where it stopped. The digest covers the offsets, targets and weights,
+so a file of the graph before an update of its weights (Graph.update_edges) is not resumed with the new weights.
+A matrix opened for reading maps the file read only: rows are memory views (NumPy arrays with numpy) of the mapped pages.
+'''
+
+MAGIC = b'RHDMAT02'
+HEADER = struct.Struct('=8sqqqq16s')
+
+class DistanceMatrix():
+    def __init__(self, path, writable=False):
+        self.path = path
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, self.n, self.m, self.C, itemsize, self.digest = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError('%s is not a distance matrix file' % path)
+        self.typecode = 'i' if itemsize == 4 else 'q'
+        # The distance of the unreachable nodes
+        self.inf = self.n * self.C + 1
+        self.bitmap_offset = HEADER.size
+        self.matrix_offset = _matrix_offset(self.n)
+        view = memoryview(self.data)
+        self.done_bits = view[self.bitmap_offset:self.bitmap_offset + (self.n + 7) // 8]
+        # The matrix as one flat view, row u is [u * n, (u + 1) * n)
+        self.values = view[self.matrix_offset:self.matrix_offset + itemsize * self.n * self.n].cast(self.typecode)
+        # Rows written since the last flush, marked by it
+        self.unmarked = []
+
+    def done(self, u):
+        return self.done_bits[u >> 3] >> (u & 7) & 1 == 1
+
+    # The sources whose row is not written yet
+    def missing(self):
+        return [u for u in range(self.n) if not self.done(u)]
+
+    def complete(self):
+        return not self.missing()
+
+    # Distances from u as a view of the mapped file (a NumPy array when NumPy is installed), without copying
+    def row(self, u):
+        if not self.done(u):
+            raise KeyError('the row of %s is not computed' % u)
+        values = self.values[u * self.n:(u + 1) * self.n]
+        if np is not None:
+            return np.frombuffer(values, dtype=np.int32 if self.typecode == 'i' else np.int64)
+        return values
+
+    def distance(self, u, v):
+        if not self.done(u):
+            raise KeyError('the row of %s is not computed' % u)
+        return self.values[u * self.n + v]
+
+    # Write the distances from u (any sequence of n integers), the row is marked done by the next flush
+    def write_row(self, u, dist):
+        if not (isinstance(dist, array) and dist.typecode == self.typecode):
+            dist = array(self.typecode, dist)
+        self.values[u * self.n:(u + 1) * self.n] = dist
+        self.unmarked.append(u)
+
+    # Flush the written rows, then mark them and flush the bitmap, so that a marked row is always on disk
+    def flush(self):
+        if not self.unmarked:
+            return
+        self.data.flush()
+        for u in self.unmarked:
+            self.done_bits[u >> 3] |= 1 << (u & 7)
+        self.unmarked = []
+        self.data.flush(0, self.matrix_offset)
+
+    # The rows returned by row() must be released first, they are views of the map
+    def close(self):
+        self.done_bits.release()
+        self.values.release()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _matrix_offset(n):
+    return HEADER.size + ((n + 7) // 8 + 7) // 8 * 8
+
+# Digest of the arcs of the graph
+def digest(graph):
+    h = hashlib.blake2b(digest_size=16)
+    for values in (graph.offsets, graph.targets, graph.weights):
+        h.update(memoryview(values).cast('B'))
+    return h.digest()
+
+# Create the file of an empty matrix, the file is sparse until the rows are written
+def create(path, graph, typecode=None):
+    inf = graph.n * graph.C + 1
+    if typecode is None:
+        typecode = 'i' if inf < 2 ** 31 else 'q'
+    if typecode not in ('i', 'q'):
+        raise ValueError("typecode is 'i' (32 bit) or 'q' (64 bit), not %r" % typecode)
+    if typecode == 'i' and inf >= 2 ** 31:
+        raise ValueError('n * C + 1 = %s does not fit in 32 bit integers' % inf)
+    itemsize = 4 if typecode == 'i' else 8
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, graph.n, graph.m, graph.C, itemsize, digest(graph)))
+        f.truncate(_matrix_offset(graph.n) + itemsize * graph.n * graph.n)
+
+# Compute the missing rows of the matrix of graph in path (created if it does not exist) and return it open for writing.
+# backend is a level of Graph.dijkstra_radix, with workers > 1 the rows are computed by parallel.dijkstra_many.
+# The rows are flushed and marked every flush_every rows.
+def compute(graph, path, backend='One Level', workers=1, typecode=None, flush_every=64):
+    if not os.path.exists(path):
+        create(path, graph, typecode)
+    matrix = DistanceMatrix(path, writable=True)
+    if (matrix.n, matrix.m, matrix.C) != (graph.n, graph.m, graph.C):
+        matrix.close()
+        raise ValueError('%s holds a matrix of another graph (n=%s, m=%s, C=%s)' % (path, matrix.n, matrix.m, matrix.C))
+    if matrix.digest != digest(graph):
+        matrix.close()
+        raise ValueError('%s holds a matrix of other arcs or weights of the graph' % path)
+    if typecode is not None and typecode != matrix.typecode:
+        matrix.close()
+        raise ValueError('%s holds %r distances, not %r' % (path, matrix.typecode, typecode))
+
+    missing = matrix.missing()
+    if workers > 1:
+        import parallel
+        rows = parallel.dijkstra_many(graph, missing, level=backend, workers=workers)
+    else:
+        rows = ((src, graph.dijkstra_radix(src, level=backend)) for src in missing)
+    try:
+        for count, (src, dist) in enumerate(rows, 1):
+            matrix.write_row(src, dist)
+            if count % flush_every == 0:
+                matrix.flush()
+    finally:
+        matrix.flush()
+    return matrix
+
+# Open a computed matrix for reading
+def load(path):
+    return DistanceMatrix(path)
@@ -0,0 +1,96 @@
+import backends
+from array import array
+
+'''
+Repair of shortest path trees after arc weight changes.
+
+A tracked tree keeps the distances and predecessors of one source (path_tree.ShortestPathTree) and is updated in place.
+ * An increased arc (u, v) only matters when u is the predecessor of v: the subtree of v (found through the arcs
+   whose head has the tail as predecessor) loses its distances, and every node of it is seeded with its best
+   distance through an in-arc from outside the subtree.
+ * A decreased arc (u, v) seeds v when dist[u] + w is below dist[v].
+The seeds go into a heap in one insert_many and a Dijkstra search from them relaxes only the nodes whose
+distance changes, so the work follows the affected region rather than the graph. Every other distance is
+still the length of a path whose weights did not increase, so it can only decrease through the seeds.
+
+The seeds can be far apart (more than C), so the heap is built for keys up to n * C and Dial buckets are not used.
+'''
+
+# The in-arcs of every node as CSR (offsets, sources, index of the arc in the forward arrays), so that their
+# weights are read from the forward weights, which are the ones updated
+def in_arcs(graph):
+    if graph.in_arcs is None:
+        graph.in_arcs = graph._reversed_arcs(array('q', range(graph.m)))
+    return graph.in_arcs
+
+def check_backend(graph, backend):
+    if backend == 'auto':
+        return backends.choose(graph.n, graph.m, graph.C, exclude=('dial',))
+    if backends.parse(backend)[0] == 'dial':
+        raise ValueError('repairs seed nodes whose distances are more than C apart, Dial buckets do not hold them')
+    return backend
+
+# Repair the tree after the arcs changed, changes are (u, v, old weight, new weight).
+# Returns the number of nodes extracted from the heap.
+def repair(graph, tree, changes, backend):
+    dist = tree.dist
+    pred = tree.pred
+    inf = tree.inf
+    offsets = graph.offsets
+    targets = graph.targets
+    weights = graph.weights
+
+    # The subtrees below the increased tree arcs
+    affected = set()
+    stack = [v for u, v, old, new in changes if new > old and pred[v] == u and v not in affected]
+    while stack:
+        x = stack.pop()
+        if x in affected:
+            continue
+        affected.add(x)
+        for y in targets[offsets[x]:offsets[x + 1]]:
+            if pred[y] == x and y not in affected:
+                stack.append(y)
+    for x in affected:
+        dist[x] = inf
+        pred[x] = -1
+
+    # label -> seeded distance
+    seeds = {}
+    if affected:
+        in_offsets, in_sources, in_index = in_arcs(graph)
+        for x in affected:
+            for i in range(in_offsets[x], in_offsets[x + 1]):
+                y = in_sources[i]
+                if y not in affected and dist[y] < inf and dist[x] > dist[y] + weights[in_index[i]]:
+                    dist[x] = dist[y] + weights[in_index[i]]
+                    pred[x] = y
+                    seeds[x] = dist[x]
+    for u, v, old, new in changes:
+        if new < old and dist[u] < inf and dist[v] > dist[u] + new:
+            dist[v] = dist[u] + new
+            pred[v] = u
+            seeds[v] = dist[v]
+    if not seeds:
+        return 0
+
+    heap = graph._reused_heap(backend, C=graph.n * graph.C)
+    heap.insert_many(list(seeds), list(seeds.values()))
+    queued = set(seeds)
+    extracted = 0
+    while len(heap) > 0:
+        x, d = heap.delete_min()
+        queued.discard(x)
+        extracted += 1
+        start = offsets[x]
+        end = offsets[x + 1]
+        for y, weight in zip(targets[start:end], weights[start:end]):
+            if dist[y] > d + weight:
+                dist[y] = d + weight
+                pred[y] = x
+                if y in queued:
+                    heap.decrease(y, dist[y])
+                else:
+                    heap.insert(y, dist[y])
+                    queued.add(y)
+    return extracted
@@ -1,10 +1,6 @@
-from doubly_list import DoublyList, Node
-from collections import namedtuple
+from array import array
 from radix_heap_2 import RadixHeap2
 
-import math
-
-NodeData = namedtuple('NodeData', 'label key')
 '''
 An class of Fibonacci heap extension for heap operation.
 It uses 2 level radix heap for supervising labeled nodes.
@@ -17,6 +13,14 @@ It provides the three heap operations as follows.
  * delete_min(): Extract the node which has a minimum distance to make it scanned.
 
 It overrides ``__len__``, that provides whether heap is empty or not.
+A batch of labeled nodes (e.g. the sources of a multi source search) is inserted in one pass with insert_many(labels, dists).
+reset(stats) empties the heap for another search without allocating, in time proportional to the number of segments.
+
+The forest is stored in preallocated arrays indexed by label: parent, child (one child of the node),
+left and right (circular list of the siblings, or of the roots), rank and mark. The key of a tree node is the
+flat segment index of its label in the radix heap. Every non empty segment has one representative (rep),
+the only node of the segment in the forest; the other nodes of the segment (passive nodes) are only in
+the segment list of the radix heap, which also gives a new representative when one leaves.
 
 Time complexity: O(m + n * sqrt(logC))
 m: the number of edges
@@ -26,292 +30,323 @@ C: the maximum distance of one edge
 '''
 
 class FibonacciHeap():
-  def __init__(self, n, C, K, debug=False):
+  def __init__(self, n, C, K, debug=False, stats=None):
     self.n = n
     self.K = K
-    self.B = int(math.ceil(math.log(C + 1, K)) + 1)
-    self.heap = RadixHeap2(n, C, K, debug=debug)
-
-    # Node that has minimum segment index
-    self.min_node = None
-
-    # a lookup table of information of nodes
-    self.nodes = [None] * n
-    self.S = [set() for x in range(self.B * self.K)]
-    self.active_roots = DoublyList()
-    self.passive_roots = DoublyList()
-    self.rank_nodes = [None] * n
+    self.heap = RadixHeap2(n, C, K, debug=debug, stats=stats)
+    self.B = self.heap.B
+
+    # Representative of each segment (-1 if the segment is empty)
+    self.reps = array('q', [-1]) * self.heap.seg_base[self.B]
+    # The forest of the representatives
+    self.parents = array('q', [-1]) * n
+    self.children = array('q', [-1]) * n
+    self.lefts = array('q', [-1]) * n
+    self.rights = array('q', [-1]) * n
+    self.ranks = array('q', [0]) * n
+    self.marks = bytearray(n)
+    # A root of the circular root list, the number of roots and the root with the minimum key (-1 if empty)
+    self.root = -1
+    self.root_count = 0
+    self.min_label = -1
+    # Roots by rank while consolidating, a rank is below 1.45 log2(n) + 2
+    self.rank_roots = array('q', [-1]) * (2 * n.bit_length() + 4)
     self.debug = debug
+    # Operation counters (heap_stats.HeapStats), None when they are disabled
+    self.stats = stats
+
+  # Empty the heap for a new search, stats replaces the operation counters.
+  # The forest fields of a node are set again when it becomes a representative, so only the roots and reps are cleared
+  def reset(self, stats=None):
+    if len(self.heap) > 0:
+      for s in range(len(self.reps)):
+        self.reps[s] = -1
+    self.heap.reset(stats)
+    self.root = -1
+    self.root_count = 0
+    self.min_label = -1
+    self.stats = stats
 
   def insert(self, label, d):
     # Insert a labeled node to radix heap
-    b, k, _ = self.heap._insert(label, self.B - 1, d)
+    key = self.heap._insert(label, self.B - 1, d)
     if self.debug == True:
       self.heap.print_buckets('insert label : %s, distance: %s' % (label, d))
 
     self.heap.len += 1
-    # Retrieve heap key from bucket index (b) and segment index (k)
-    key = b * self.K + k 
-    # Append a new node to root trees
-    new_node = Node(NodeData(label=label, key=key))
-    self.nodes[label] = new_node
-    self.S[key].add(label)
-
-    # If there is only one element in the set, set the new node as a representative
-    if len(self.S[key]) == 1:
-      new_node.active = True
-      self.active_roots.append_node(new_node) 
-      # Update min node
-      self._update_min(new_node)
-    else:
-      self.passive_roots.append_node(new_node)
+    if self.stats is not None:
+      self.stats.inserted(self.heap.len)
+    # If the segment has no representative, the new node becomes the representative as a new root
+    if self.reps[key] == -1:
+      self._add_rep(label, key)
 
     if self.debug == True:
       self.print_heap('insert label : %s, distance: %s' % (label, d))
 
-  def decrease(self, label, d):
-    # Decrease a labeled node
-    self.heap.decrease(label, d)
-
-    b, k, _ = self.heap.node_table[label]
-    key = b * self.K + k
-    node = self.nodes[label]
-    prev_key = node.data.key
-    # Update a new key of heap node
-    node.data = NodeData(label=label, key=key)
-
-    # If heap condition is violated, do link cut process
-    if node.parent != None and node.parent.data.key > node.data.key:
-      parent = node.parent
-      self._cut(node)
-      self._cascading_cut(parent)
-
-    # Remove the node from the previous set
-    self.S[prev_key].remove(label)
-    # If there are remaining nodes in the previous segment, assign a new node as a representative
-    new_representative = None
-    if len(self.S[prev_key]) > 0 and node.active == True:
-      new_representative = self.nodes[next(iter(self.S[prev_key]))]
-      new_representative.active = True
-      self.passive_roots.remove(new_representative)
-      self.active_roots.append_node(new_representative)
-
-    # Move the node to the new set
-    self.S[key].add(label)
-
-    # If the new set already has a representative, remove a node as a representative
-    if len(self.S[key]) > 1 and node.active == True:
-      if self.min_node.data.label == label:
-        self.min_node = None
-      node.active = False
-
-      # If the previous position of node is not root, it links the children to its parent.
-      if node.parent != None:
-        parent = node.parent
-        parent.children.remove(node)
-        node.parent = None
-        while node.children.len > 0:
-          child = node.children.pop()
-          child.parent = parent
-          parent.children.append_node(child)
-      # Else, it appends the children to active roots
-      else:
-        self.active_roots.remove(node)
-        while node.children.len > 0:
-          child = node.children.pop()
-          child.parent = None
-          self.active_roots.append_node(child)
-          self._update_min(child)
-
-      self.passive_roots.append_node(node)
-
-    # If the new set is empty, assign the node as a representative
-    if len(self.S[key]) == 1 and node.active == False:
-      node.active = True
-      self.passive_roots.remove(node)
-      self.active_roots.append_node(node)
+  def insert_many(self, labels, dists):
+    # Distribute the whole batch in the radix heap, then the first node of each segment becomes its representative
+    self.heap.insert_many(labels, dists)
+    segments = self.heap.node_segments
+    for label in labels:
+      if self.reps[segments[label]] == -1:
+        self._add_rep(label, segments[label])
 
-    self._update_min(node)
+    if self.debug == True:
+      self.print_heap('insert %s labels' % len(labels))
 
-    # If there is a new representative, update min
-    if new_representative != None:
-      self._update_min(new_representative)
+  def decrease(self, label, d):
+    # Decrease a labeled node
+    prev_key = self.heap._remove(label)
+    key = self.heap._insert(label, self.heap.seg_bucket[prev_key], d)
+    if self.stats is not None:
+      self.stats.decreases += 1
+    if self.debug == True:
+      self.heap.print_buckets('decrease label: %s, distance: %s' % (label, d))
+
+    if key != prev_key:
+      if self.reps[prev_key] == label:
+        # The previous segment needs another representative if it is not empty
+        self.reps[prev_key] = -1
+        if self.heap.segment_lens[prev_key] > 0:
+          self._add_rep(self.heap.segment_heads[prev_key], prev_key)
+        if self.reps[key] == -1:
+          # The node represents a segment with a smaller key, cut it if the heap order is violated
+          self.reps[key] = label
+          parent = self.parents[label]
+          if parent != -1 and self.heap.node_segments[parent] > key:
+            self._cut(label)
+            self._cascading_cut(parent)
+          self._update_min(label)
+        else:
+          # The new segment already has a representative, the node becomes passive
+          self._delete_node(label)
+          if self.min_label == label:
+            self._find_min()
+      elif self.reps[key] == -1:
+        self._add_rep(label, key)
 
     if self.debug == True:
       self.print_heap('decrease label : %s, distance: %s' % (label, d))
-    
 
   def delete_min(self):
-    min_key = self.min_node.data.key
-    b = min_key // self.K
-    k = min_key - b * self.K
-
-    # If the minimum node is in a first segment, there is no redistribution process
-    if min_key == 0:
-      self.S[min_key].remove(self.min_node.data.label)
-
-      # If there are remaining nodes in the previous segment, assign a new node as a representative
-      if len(self.S[min_key]) > 0:
-        new_representative = self.nodes[next(iter(self.S[min_key]))]
-        new_representative.active = True
-        self.passive_roots.remove(new_representative)
-        self.active_roots.append_node(new_representative)
-
-      # Extract min and do a linking operation
-      self._extract_min_in_tree()
-      result = self.heap.delete_min()
-
-      if self.debug == True:
-        self.print_heap('delete min label : %s, distance: %s' % result)
-
-      return result
-
-    else:
-      min_node, redistributed_info = self.heap._redistribute(b, k)
-      self.S[min_key] = set()
-      min_label = min_node.data[0]
-      if len(redistributed_info) > 0:
-        # If the actual minimum node is in active trees
-        if min_label == self.min_node.data.label:
-          # Redistribute
-          self._redistribute(redistributed_info)
-          # Remove the remaining minimum node and do linking operation
-          self._extract_min_in_tree()
-        else:
-          # Insert the node that was in the active root first
-          prev_active_node_index = [i for i, target in enumerate(redistributed_info) if target[2].data[0] == self.min_node.data.label][0]
-          target = redistributed_info[prev_active_node_index]
-          node_key = target[0] * self.K + target[1]
-          self.S[node_key].add(target[2].data[0])
-          self.min_node.data = NodeData(label=self.min_node.data.label, key=node_key)
-          # Redistribute
-          self._redistribute(redistributed_info)
-          # Remove minimum node which is not a representative from the passive trees and do linking operation
-          self.passive_roots.remove(self.nodes[min_label])
-          self._consolidate()
-      # If there is only one node in the minimum key set, just extract min node and do linking operation
+    if self.stats is not None:
+      # The minimum segment is the key of the minimum root, the consolidation counts the roots it walks
+      self.stats.delete_mins += 1
+      self.stats.delete_min_scans += 1
+    min_key = self.heap.node_segments[self.min_label]
+    b = self.heap.seg_bucket[min_key]
+    k = min_key - self.heap.seg_base[b]
+
+    # The segments of the first bucket hold a single distance, there is no redistribution process
+    if b == 0:
+      min_label = self.heap.segment_heads[min_key]
+      if self.heap.segment_lens[min_key] > 1:
+        # Extract a passive node of the segment, the forest does not change
+        if min_label == self.min_label:
+          min_label = self.heap.next_nodes[min_label]
       else:
+        self.reps[min_key] = -1
         self._extract_min_in_tree()
-    
-    result = self.heap.node_table[min_label][2].data
+      self.heap.len -= 1
+      self.heap._remove(min_label)
+      self.heap.node_segments[min_label] = -1
+
+    else:
+      # The segment is emptied, its representative leaves the forest before the nodes move
+      self.reps[min_key] = -1
+      self._extract_min_in_tree(consolidate=False)
+      moved_labels = []
+      min_label = self.heap._redistribute(b, k, moved_labels)
+      # Each moved node becomes the representative of its new segment if that segment has none
+      segments = self.heap.node_segments
+      for label in moved_labels:
+        if self.reps[segments[label]] == -1:
+          self._add_rep(label, segments[label])
+      self._consolidate()
+
+    result = (min_label, self.heap.node_keys[min_label])
     if self.debug:
       self.heap.print_buckets('delete min label : %s, distance: %s' % result)
-      self.print_heap('delete min label : %s, distance: %s' % result) 
+      self.print_heap('delete min label : %s, distance: %s' % result)
     return result
-    
+
   def __len__(self):
     return len(self.heap)
 
-  # Extract minimum node to delete, do consolidate operation
-  def _extract_min_in_tree(self):
-    min_node = self.min_node
-    self.min_node = None
-    deleted_node = self.active_roots.remove(min_node)
-
-    # Update children to active root
-    children = deleted_node.children
-    while children.len > 0:
-      child = children.pop()
-      child.parent = None
-      self.active_roots.append_node(child)
-
-    self._consolidate()
-
-  # Cut the target node from the parent and append to the active tree roots
-  def _cut(self, node):
-    parent = node.parent
-    parent.children.remove(node)
-    self.active_roots.append_node(node)
-    node.parent = None
-    node.mark = False
-
-  # If the mark of parent node is true, recursively call cut operation
-  def _cascading_cut(self, node):
-    parent = node.parent
-    # If node is not a root
-    if parent != None:
-      if parent.mark == False and parent.children.len > 0:
-        parent.mark = True
-      else:
-        self._cut(node)
-        self._cascading_cut(parent)
+  # Make the label the representative of the segment as a new root
+  def _add_rep(self, label, key):
+    self.reps[key] = label
+    self.children[label] = -1
+    self.ranks[label] = 0
+    self.marks[label] = 0
+    self._add_root(label)
+    self._update_min(label)
+
+  # Append the label to the circular root list
+  def _add_root(self, label):
+    self.parents[label] = -1
+    if self.root == -1:
+      self.root = self.lefts[label] = self.rights[label] = label
+    else:
+      self._splice(self.root, label)
+    self.root_count += 1
+
+  # Insert the label after the node x of a circular list
+  def _splice(self, x, label):
+    right = self.rights[x]
+    self.lefts[label] = x
+    self.rights[label] = right
+    self.lefts[right] = label
+    self.rights[x] = label
+
+  # Unlink the label from its circular list, return the next node (-1 if the list becomes empty)
+  def _unlink(self, label):
+    right = self.rights[label]
+    if right == label:
+      return -1
+    left = self.lefts[label]
+    self.rights[left] = right
+    self.lefts[right] = left
+    return right
+
+  def _remove_root(self, label):
+    next_root = self._unlink(label)
+    if self.root == label:
+      self.root = next_root
+    self.root_count -= 1
+
+  # Move the children of the label to the root list
+  def _promote_children(self, label):
+    child = self.children[label]
+    for _ in range(self.ranks[label]):
+      next_child = self.rights[child]
+      self.marks[child] = 0
+      self._add_root(child)
+      child = next_child
+    self.children[label] = -1
+    self.ranks[label] = 0
+
+  # Remove the minimum root to delete, do consolidate operation
+  def _extract_min_in_tree(self, consolidate=True):
+    min_label = self.min_label
+    self.min_label = -1
+    self._promote_children(min_label)
+    self._remove_root(min_label)
+    if consolidate:
+      self._consolidate()
+
+  # Remove a node that becomes passive from the forest, its children become roots
+  def _delete_node(self, label):
+    parent = self.parents[label]
+    if parent != -1:
+      self._cut(label)
+      self._cascading_cut(parent)
+    self._promote_children(label)
+    self._remove_root(label)
+
+  # Cut the target node from the parent and append to the root list
+  def _cut(self, label):
+    parent = self.parents[label]
+    next_child = self._unlink(label)
+    if self.children[parent] == label:
+      self.children[parent] = next_child
+    self.ranks[parent] -= 1
+    self.marks[label] = 0
+    self._add_root(label)
+
+  # Mark the node when it loses its first child, cut it from its parent when it loses the second one
+  def _cascading_cut(self, label):
+    parent = self.parents[label]
+    while parent != -1:
+      if self.marks[label] == 0:
+        self.marks[label] = 1
+        return
+      self._cut(label)
+      label = parent
+      parent = self.parents[label]
 
   def _consolidate(self):
-    # Do linking operations so that no active root with the same rank exists
-    active_roots = self.active_roots.get_nodes()
-    self.min_node = active_roots[0] if len(active_roots) > 0 else None
-    max_rank = 0
-    for root in active_roots:
-      rank = root.children.len
+    # Do linking operations so that no root with the same rank exists.
+    # The root list is detached and walked once, the roots are then collected back from the rank array
+    segments = self.heap.node_segments
+    rank_roots = self.rank_roots
+    root = self.root
+    count = self.root_count
+    if self.stats is not None:
+      self.stats.consolidations += 1
+      self.stats.delete_min_scans += count
+    self.root = -1
+    self.root_count = 0
+    max_rank = -1
+    for _ in range(count):
       new_root = root
+      root = self.rights[root]
+      rank = self.ranks[new_root]
 
       # Do linking operation until there is an empty space in rank node array
-      while self.rank_nodes[rank] != None:
-        prev_node = self.rank_nodes[rank]
-        if new_root.data.key > prev_node.data.key:
-          new_root = self._link(new_root, prev_node)
-        else:
-          new_root = self._link(prev_node, new_root)
-
-        self.rank_nodes[rank] = None
+      while rank_roots[rank] != -1:
+        prev_root = rank_roots[rank]
+        if segments[new_root] > segments[prev_root]:
+          new_root, prev_root = prev_root, new_root
+        self._link(prev_root, new_root)
+        rank_roots[rank] = -1
         rank += 1
 
-      self.rank_nodes[rank] = new_root
+      rank_roots[rank] = new_root
       if max_rank < rank:
         max_rank = rank
 
-      self._update_min(new_root)
-
-    for i in range(max_rank + 1):
-      self.rank_nodes[i] = None
-
-  # Select a minimum node from active roots
-  def _update_min(self, node):
-    if node.active == True and (self.min_node == None or self.min_node.data.key > node.data.key):
-      self.min_node = node
-
-  # Redistribute passive nodes to a new set
-  # If there is no representative in the set, assign the passive nodes as representatives
-  def _redistribute(self, redistributed_info):
-    for target in redistributed_info:
-      target_label = target[2].data[0]
-      target_key = target[0] * self.K + target[1]
-      target_node = self.nodes[target_label]
-
-      # Do not consider remain node
-      if target_node.active == True:
-        continue
-
-      self.S[target_key].add(target_label)
-      target_node.data = NodeData(label=target_label, key=target_key)
-      if len(self.S[target_key]) == 1:
-        target_node.active = True
-        self.passive_roots.remove(target_node)
-        self.active_roots.append_node(target_node)
+    self.min_label = -1
+    for rank in range(max_rank + 1):
+      if rank_roots[rank] != -1:
+        self._add_root(rank_roots[rank])
+        self._update_min(rank_roots[rank])
+        rank_roots[rank] = -1
+
+  # Select a minimum node from the roots
+  def _update_min(self, label):
+    if self.min_label == -1 or self.heap.node_segments[self.min_label] > self.heap.node_segments[label]:
+      self.min_label = label
+
+  def _find_min(self):
+    self.min_label = -1
+    root = self.root
+    for _ in range(self.root_count):
+      self._update_min(root)
+      root = self.rights[root]
 
   def _link(self, x, y):
     # Convert root x to child of y
-    self.active_roots.remove(x)
-    y.children.append_node(x)
-    x.parent = y
-    y.mark = False
-    return y
-
+    if self.stats is not None:
+      self.stats.links += 1
+    if self.children[y] == -1:
+      self.children[y] = self.lefts[x] = self.rights[x] = x
+    else:
+      self._splice(self.children[y], x)
+    self.parents[x] = y
+    self.ranks[y] += 1
+    self.marks[x] = 0
 
   def print_heap(self, op_name):
-    title_str = '* ------ Operation: %s ------- *' % op_name 
+    title_str = '* ------ Operation: %s ------- *' % op_name
     print('\n' + title_str)
     print('\n Active trees : ')
-    for node in self.active_roots.get_nodes():
-      self._print_node(node, 0)
+    root = self.root
+    for _ in range(self.root_count):
+      self._print_node(root, 0)
+      root = self.rights[root]
 
-    print('\n Passive trees : ')
-    for node in self.passive_roots.get_nodes():
-      self._print_node(node, 0)
+    print('\n Passive nodes : ')
+    for s in range(self.heap.seg_base[self.B]):
+      passive = [label for label, _ in self.heap._get_items(s) if label != self.reps[s]]
+      if passive:
+        print('  ' + str(s) + ' ' + str(passive))
 
     print ('\n* ' + '-' * (len(title_str) - 4) + ' *')
 
-  def _print_node(self, node, height):
-    print('  ' * height + '->' + str(node.data))
-    for child in node.children.get_nodes():
-      self._print_node(child, height + 1)
\ No newline at end of file
+  def _print_node(self, label, height):
+    print('  ' * height + '->' + str((label, self.heap.node_segments[label])))
+    child = self.children[label]
+    for _ in range(self.ranks[label]):
+      self._print_node(child, height + 1)
+      child = self.rights[child]
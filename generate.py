@@ -0,0 +1,32 @@
+import random
+from array import array
+from dijkstra import Graph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Random graphs for the benchmarks.
+
+Every node has degree arcs: one to the next node (so that every node is reachable from any source)
+and degree - 1 to uniformly random nodes, with weights drawn uniformly from [1, C].
+The arcs are generated in source order, so they are already in the CSR layout.
+'''
+
+def random_graph(n, degree=8, C=1000, seed=0):
+    m = n * degree
+    if np is not None:
+        rand = np.random.default_rng(seed)
+        targets = rand.integers(0, n, m, dtype=np.int64)
+        targets[::degree] = (np.arange(n, dtype=np.int64) + 1) % n
+        weights = rand.integers(1, C + 1, m, dtype=np.int64)
+        offsets = np.arange(0, m + 1, degree, dtype=np.int64)
+    else:
+        rand = random.Random(seed)
+        targets = array('q', (rand.randrange(n) for _ in range(m)))
+        targets[::degree] = array('q', ((u + 1) % n for u in range(n)))
+        weights = array('q', (rand.randint(1, C) for _ in range(m)))
+        offsets = array('q', range(0, m + 1, degree))
+    return Graph(n, C, offsets=offsets, targets=targets, weights=weights)
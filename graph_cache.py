@@ -0,0 +1,53 @@
+import mmap
+import os
+import struct
+from dijkstra import Graph
+
+'''
+Binary on-disk format of a Graph, loaded by memory mapping the file.
+
+ * header: magic (8 bytes), n, m, C (64 bit integers)
+ * offsets: n + 1 64 bit integers
+ * targets: m 64 bit integers
+ * weights: m 64 bit integers
+
+The arrays of a loaded Graph are read only views of the mapped pages, so loading does not copy anything
+and several processes loading the same file share the pages through the page cache.
+'''
+
+MAGIC = b'RHGRAPH1'
+HEADER = struct.Struct('=8sqqq')
+
+def write(path, graph):
+    # Write to a temporary file first so that a concurrent reader never maps a half written file
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, graph.n, graph.m, graph.C))
+        f.write(memoryview(graph.offsets).cast('B'))
+        f.write(memoryview(graph.targets).cast('B'))
+        f.write(memoryview(graph.weights).cast('B'))
+    os.replace(tmp_path, path)
+
+def load(path):
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, m, C = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('%s is not a graph cache file' % path)
+
+    view = memoryview(data)
+    start = HEADER.size
+    offsets = view[start:start + 8 * (n + 1)].cast('q')
+    start += 8 * (n + 1)
+    targets = view[start:start + 8 * m].cast('q')
+    start += 8 * m
+    weights = view[start:start + 8 * m].cast('q')
+    return Graph(n, C, offsets=offsets, targets=targets, weights=weights)
+
+def cache_path(path):
+    return path + '.rhg'
+
+# The cache is fresh if it is not older than the source file
+def is_fresh(path):
+    target = cache_path(path)
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path)
@@ -0,0 +1,38 @@
+'''
+Operation counters of the heaps.
+
+A heap constructed with stats=HeapStats() updates the counters on every operation,
+a heap constructed without it (stats=None) only tests that the attribute is None.
+
+ * inserts, decreases, delete_mins: calls per operation
+ * insert_scans: buckets examined by insert/decrease and by the reinsertion of moved nodes
+ * delete_min_scans: buckets (or segments) examined by delete_min to find the left most non empty one,
+   for the Fibonacci heap the minimum segment and the roots walked by the consolidation
+ * redistributions, moved_nodes, max_moved_nodes: nodes moved when a bucket is redistributed
+ * links, consolidations: linking operations of the Fibonacci heap
+ * max_size: maximum number of nodes in the heap
+'''
+class HeapStats():
+  FIELDS = ['inserts', 'decreases', 'delete_mins', 'insert_scans', 'delete_min_scans',
+            'redistributions', 'moved_nodes', 'max_moved_nodes', 'links', 'consolidations', 'max_size']
+
+  def __init__(self):
+    for field in self.FIELDS:
+      setattr(self, field, 0)
+
+  def inserted(self, size, count=1):
+    self.inserts += count
+    if self.max_size < size:
+      self.max_size = size
+
+  def redistributed(self, moved):
+    self.redistributions += 1
+    self.moved_nodes += moved
+    if self.max_moved_nodes < moved:
+      self.max_moved_nodes = moved
+
+  def as_dict(self):
+    return {field: getattr(self, field) for field in self.FIELDS}
+
+  def __repr__(self):
+    return 'HeapStats(%s)' % ', '.join('%s=%s' % item for item in self.as_dict().items())
@@ -0,0 +1,173 @@
+import argparse
+import struct
+import sys
+from array import array
+
+'''
+Recording of the heap operations of a search, and their replay on any backend.
+
+A search run with trace=Trace(n, C) (Graph.dijkstra_radix) wraps its heap in a TracingHeap, which appends
+every operation to the trace as two integers: the label shifted left by 2 with the operation in the low bits,
+and the distance. A delete_min records the node it returned. insert_many is recorded as its inserts.
+The records are a typed array, 32 bit while the labels and the distances fit, saved after a small header
+(magic, item size, n, C) in little endian byte order.
+
+replay feeds the records to a heap in a tight loop, so the backends are compared (and profiled) on real
+workloads without the cost of the graph traversal. Backends may break ties between equal distances
+differently, so when the replayed heap returns another node with the recorded distance, the two labels
+are swapped for the rest of the trace: both nodes had that distance, so the remaining operations stay valid.
+A different distance raises ValueError.
+'''
+
+MAGIC = b'RHTR'
+_HEADER = struct.Struct('<4sBqq')
+INSERT = 0
+DECREASE = 1
+DELETE_MIN = 2
+OPERATIONS = ['insert', 'decrease', 'delete_min']
+
+class Trace():
+  def __init__(self, n, C, records=None):
+    self.n = n
+    # The bound of the distances of the heap that recorded the trace
+    self.C = C
+    if records is None:
+      records = array('i' if 4 * n < 2 ** 31 and n * C + 1 < 2 ** 31 else 'q')
+    # (label << 2 | operation, distance) of every operation
+    self.records = records
+
+  # The number of operations
+  def __len__(self):
+    return len(self.records) // 2
+
+  # The number of operations of each kind
+  def counts(self):
+    counts = dict.fromkeys(OPERATIONS, 0)
+    for code in self.records[::2]:
+      counts[OPERATIONS[code & 3]] += 1
+    return counts
+
+  def save(self, path):
+    records = self.records
+    if sys.byteorder == 'big':
+      records = array(records.typecode, records)
+      records.byteswap()
+    with open(path, 'wb') as f:
+      f.write(_HEADER.pack(MAGIC, records.itemsize, self.n, self.C))
+      records.tofile(f)
+
+  @classmethod
+  def load(cls, path):
+    with open(path, 'rb') as f:
+      magic, itemsize, n, C = _HEADER.unpack(f.read(_HEADER.size))
+      if magic != MAGIC:
+        raise ValueError('%s is not a heap trace' % path)
+      records = array('i' if itemsize == 4 else 'q')
+      records.frombytes(f.read())
+    if sys.byteorder == 'big':
+      records.byteswap()
+    return cls(n, C, records)
+
+# A heap that records the operations on the wrapped heap into a trace
+class TracingHeap():
+  def __init__(self, heap, trace):
+    self.heap = heap
+    self.trace = trace
+    self._append = trace.records.append
+
+  def insert(self, label, d):
+    self._append(label << 2 | INSERT)
+    self._append(d)
+    self.heap.insert(label, d)
+
+  def insert_many(self, labels, dists):
+    for label, d in zip(labels, dists):
+      self._append(label << 2 | INSERT)
+      self._append(d)
+    self.heap.insert_many(labels, dists)
+
+  def decrease(self, label, d):
+    self._append(label << 2 | DECREASE)
+    self._append(d)
+    self.heap.decrease(label, d)
+
+  def delete_min(self):
+    label, d = self.heap.delete_min()
+    self._append(label << 2 | DELETE_MIN)
+    self._append(d)
+    return label, d
+
+  def reset(self, stats=None):
+    self.heap.reset(stats)
+
+  def __len__(self):
+    return len(self.heap)
+
+# Run the operations of the trace on an empty heap of trace.n nodes whose distances are bounded by trace.C
+def replay(trace, heap):
+  insert = heap.insert
+  decrease = heap.decrease
+  delete_min = heap.delete_min
+  # aliases[label of the trace] -> label in the heap, owners is the inverse
+  aliases = array('q', range(trace.n))
+  owners = array('q', range(trace.n))
+  records = iter(trace.records)
+  for code, d in zip(records, records):
+    label = aliases[code >> 2]
+    operation = code & 3
+    if operation == INSERT:
+      insert(label, d)
+    elif operation == DECREASE:
+      decrease(label, d)
+    else:
+      min_label, min_d = delete_min()
+      if min_d != d:
+        raise ValueError('the heap returned the distance %s where the trace has %s' % (min_d, d))
+      if min_label != label:
+        # Swap the two labels of equal distance
+        other = owners[min_label]
+        aliases[code >> 2] = min_label
+        aliases[other] = label
+        owners[min_label] = code >> 2
+        owners[label] = other
+
+if __name__ == '__main__':
+  import backends
+  import benchmark
+  parser = argparse.ArgumentParser(description='Record the heap operations of a search, or replay a recorded trace on the backends')
+  commands = parser.add_subparsers(dest='command', required=True)
+  record_parser = commands.add_parser('record', help='record the search from a source of a DIMACS file')
+  record_parser.add_argument('input', help='input file')
+  record_parser.add_argument('output', help='trace file to write')
+  record_parser.add_argument('--src', type=int, default=0, help='source node (0 based)')
+  record_parser.add_argument('--backend', default='One Level', help='backend spec that runs the search')
+  replay_parser = commands.add_parser('replay', help='time the replay of a trace on each backend')
+  replay_parser.add_argument('trace', help='trace file')
+  replay_parser.add_argument('--backends', default=','.join(spec for _, spec in benchmark.BACKENDS if spec not in (None, benchmark.DELTA)),
+                             help='comma separated backend specs (%s, e.g. radix2:K=8)' % ' | '.join(backends.names()))
+  replay_parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per backend')
+  replay_parser.add_argument('--profile', action='store_true', help='profile one replay of each backend instead of timing it')
+  args = parser.parse_args()
+
+  if args.command == 'record':
+    import dimacs
+    graph = dimacs.load(args.input)
+    trace = Trace(graph.n, graph.C)
+    graph.dijkstra_radix(args.src, level=args.backend, trace=trace)
+    trace.save(args.output)
+    print(args.output, ':', ', '.join('%s=%s' % item for item in trace.counts().items()))
+  else:
+    trace = Trace.load(args.trace)
+    specs = args.backends.split(',')
+    if args.profile:
+      import cProfile
+      import pstats
+      for spec in specs:
+        print('---------------------------')
+        print(spec)
+        heap = backends.create(spec, trace.n, trace.C)
+        profiler = cProfile.Profile()
+        profiler.runcall(replay, trace, heap)
+        pstats.Stats(profiler).sort_stats('tottime').print_stats(10)
+    else:
+      benchmark.print_replay(benchmark.replay_times(trace, specs, repeat=args.repeat))
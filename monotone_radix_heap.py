@@ -0,0 +1,185 @@
+from array import array
+
+'''
+An class of monotone radix heap for supervising labeled nodes.
+
+It provides the three heap operations as follows.
+ * insert(label, d): Insert the labeled node to the heap with its label and distance.
+ * decrease(label, d): Pick up the already inserted node from the heap and insert again according to a new distance.
+ * delete_min(): Extract the node which has a minimum distance to make it scanned.
+
+It overrides ``__len__``, that provides whether heap is empty or not.
+A batch of labeled nodes (e.g. the sources of a multi source search) is inserted in one pass with insert_many(labels, dists).
+reset(stats) empties the heap for another search without allocating, in time proportional to the number of buckets.
+
+The bucket of a node is the position of the highest bit in which its distance differs from the last
+extracted minimum, ``(d ^ last_min).bit_length()``, so it is computed with one integer operation
+and there are no upper bounds to maintain. Distances must not be smaller than the last extracted minimum.
+
+Time complexity: O(m + nlogC)
+m: the number of edges
+n: the number of nodes
+C: the maximum distance of one edge
+
+'''
+class MonotoneRadixHeap():
+
+  def __init__(self, n, C, debug=False, stats=None):
+
+    self.n = n
+    self.C = C
+    # The number of buckets, enough for every distance up to n * C + 1
+    self.B = (self.n * self.C + 1).bit_length() + 1
+    # Each bucket is a doubly linked list of labels, stored as a head, a tail and a length per bucket
+    self.bucket_heads = array('q', [-1]) * self.B
+    self.bucket_tails = array('q', [-1]) * self.B
+    self.bucket_lens = array('q', [0]) * self.B
+    # Look up tables for each node: links in its bucket, bucket index (-1 if not in the heap) and distance
+    self.next_nodes = array('q', [-1]) * self.n
+    self.prev_nodes = array('q', [-1]) * self.n
+    self.node_buckets = array('q', [-1]) * self.n
+    self.node_keys = array('q', [0]) * self.n
+    # The distance of the last extracted node
+    self.last_min = 0
+    # The number of labeled nodes in the heap
+    self.len = 0
+    self.debug = debug
+    # Operation counters (heap_stats.HeapStats), None when they are disabled
+    self.stats = stats
+
+  # Empty the heap for a new search, stats replaces the operation counters. The arrays indexed by label are kept:
+  # the nodes left by a search that stopped early keep a stale bucket index, which is only read for nodes in the heap
+  def reset(self, stats=None):
+    if self.len > 0:
+      for b in range(self.B):
+        self.bucket_heads[b] = self.bucket_tails[b] = -1
+        self.bucket_lens[b] = 0
+    self.last_min = 0
+    self.len = 0
+    self.stats = stats
+
+  def insert(self, label, d):
+    self.node_keys[label] = d
+    self._append((d ^ self.last_min).bit_length(), label)
+    self.len += 1
+    if self.stats is not None:
+      self.stats.inserted(self.len)
+      self.stats.insert_scans += 1
+    if self.debug:
+      self.print_buckets('insert label : %s, distance: %s' % (label, d))
+
+  def insert_many(self, labels, dists):
+    keys = self.node_keys
+    last_min = self.last_min
+    for label, d in zip(labels, dists):
+      keys[label] = d
+      self._append((d ^ last_min).bit_length(), label)
+    self.len += len(labels)
+    if self.stats is not None:
+      self.stats.inserted(self.len, len(labels))
+      self.stats.insert_scans += len(labels)
+    if self.debug:
+      self.print_buckets('insert %s labels' % len(labels))
+
+  def decrease(self, label, d):
+    self._remove(label)
+    self.node_keys[label] = d
+    self._append((d ^ self.last_min).bit_length(), label)
+    if self.stats is not None:
+      self.stats.decreases += 1
+      self.stats.insert_scans += 1
+    if self.debug:
+      self.print_buckets('decrease label: %s, distance: %s' % (label, d))
+
+  # Remove the minimum node from the left most bucket and redistribute the nodes from the bucket
+  def delete_min(self):
+    self.len -= 1
+    keys = self.node_keys
+    if self.stats is not None:
+      self.stats.delete_mins += 1
+    if self.bucket_lens[0] == 0:
+      next_nodes = self.next_nodes
+      i = 1
+      while self.bucket_lens[i] == 0:
+        i += 1
+      if self.stats is not None:
+        self.stats.delete_min_scans += i
+        self.stats.insert_scans += self.bucket_lens[i]
+        self.stats.redistributed(self.bucket_lens[i] - 1)
+
+      # Detach all nodes and find minimum node at the same time
+      head = self.bucket_heads[i]
+      self.bucket_heads[i] = self.bucket_tails[i] = -1
+      self.bucket_lens[i] = 0
+      min_label = curr = head
+      while curr != -1:
+        if keys[min_label] > keys[curr]:
+          min_label = curr
+        curr = next_nodes[curr]
+
+      # Every node of the bucket moves to a lower bucket relative to the new minimum
+      last_min = self.last_min = keys[min_label]
+      curr = head
+      while curr != -1:
+        next_label = next_nodes[curr]
+        self._append((keys[curr] ^ last_min).bit_length(), curr)
+        curr = next_label
+
+    min_label = self.bucket_heads[0]
+    self._remove(min_label)
+    self.node_buckets[min_label] = -1
+    if self.stats is not None:
+      self.stats.delete_min_scans += 1
+    if self.debug:
+      self.print_buckets('delete min label: %s, distance: %s' % (min_label, keys[min_label]))
+    return (min_label, keys[min_label])
+
+  # Append the label to the tail of the bucket
+  def _append(self, b, label):
+    tail = self.bucket_tails[b]
+    self.prev_nodes[label] = tail
+    self.next_nodes[label] = -1
+    if tail == -1:
+      self.bucket_heads[b] = label
+    else:
+      self.next_nodes[tail] = label
+    self.bucket_tails[b] = label
+    self.bucket_lens[b] += 1
+    self.node_buckets[label] = b
+
+  # Unlink the label from its bucket and return the index of the bucket
+  def _remove(self, label):
+    b = self.node_buckets[label]
+    prev_label = self.prev_nodes[label]
+    next_label = self.next_nodes[label]
+    if prev_label == -1:
+      self.bucket_heads[b] = next_label
+    else:
+      self.next_nodes[prev_label] = next_label
+    if next_label == -1:
+      self.bucket_tails[b] = prev_label
+    else:
+      self.prev_nodes[next_label] = prev_label
+    self.bucket_lens[b] -= 1
+    return b
+
+  def __len__(self):
+    return self.len
+
+  def print_buckets(self, op_name):
+    title_str = '* ------ Operation: %s ------- *' % op_name
+    print('\n' + title_str)
+    print('\n Bucket states (last min: %s) : ' % self.last_min)
+    for i in range(self.B):
+      if self.bucket_lens[i] > 0:
+        print(' ' + str(i) + ' ' + str(self._get_items(i)))
+
+    print ('\n* ' + '-' * (len(title_str) - 4) + ' *')
+
+  def _get_items(self, b):
+    items = []
+    curr = self.bucket_heads[b]
+    while curr != -1:
+      items.append((curr, self.node_keys[curr]))
+      curr = self.next_nodes[curr]
+    return items
@@ -0,0 +1,88 @@
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from dijkstra import Graph
+
+'''
+Process pool helpers that share the CSR arrays of a Graph through multiprocessing.shared_memory.
+
+The parent copies offsets, targets and weights into one shared block once,
+every worker maps the block in its initializer and builds a Graph on views of it,
+so a task only sends a source node and receives a distance array.
+'''
+
+# n, m, C
+HEADER = struct.Struct('=qqq')
+
+class SharedGraph():
+    def __init__(self, graph):
+        self.n = graph.n
+        self.m = graph.m
+        self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + 8 * (graph.n + 1 + 2 * graph.m))
+        HEADER.pack_into(self.shm.buf, 0, graph.n, graph.m, graph.C)
+        start = HEADER.size
+        for values in (graph.offsets, graph.targets, graph.weights):
+            data = memoryview(values).cast('B')
+            self.shm.buf[start:start + len(data)] = data
+            start += len(data)
+        self.name = self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Build a Graph on the arrays of a shared block, returns the block too since the views need it open
+def attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    n, m, C = HEADER.unpack_from(shm.buf)
+    view = shm.buf
+    start = HEADER.size
+    offsets = view[start:start + 8 * (n + 1)].cast('q')
+    start += 8 * (n + 1)
+    targets = view[start:start + 8 * m].cast('q')
+    start += 8 * m
+    weights = view[start:start + 8 * m].cast('q')
+    return shm, Graph(n, C, offsets=offsets, targets=targets, weights=weights)
+
+# State of a worker process
+_worker_shm = None
+_worker_graph = None
+
+def _init_worker(name):
+    global _worker_shm, _worker_graph
+    _worker_shm, _worker_graph = attach(name)
+
+def _solve(src, level):
+    if level == 'heapq':
+        dist = _worker_graph.dijkstra_naive(src)
+    else:
+        dist = _worker_graph.dijkstra_radix(src, level=level)
+    return src, array('q', dist)
+
+# Yield (source, distances) in the order the searches finish
+def dijkstra_many(graph, sources, level='One Level', workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for src in sources:
+            dist = graph.dijkstra_naive(src) if level == 'heapq' else graph.dijkstra_radix(src, level=level)
+            yield src, array('q', dist)
+        return
+
+    with SharedGraph(graph) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared.name,)) as pool:
+            futures = [pool.submit(_solve, src, level) for src in sources]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # Stop the remaining searches if the consumer stops early
+                for future in futures:
+                    future.cancel()
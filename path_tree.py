@@ -0,0 +1,44 @@
+from array import array
+
+'''
+Shortest path tree of a single source search.
+
+The searches record the predecessor of every node while relaxing (the node whose arc gave the final distance)
+in a typed array, 32 bit while the node ids fit, with -1 for the source and the unreachable nodes.
+A path is read backwards from the target through the predecessors, so any number of targets
+are reconstructed from the same tree without another search.
+'''
+
+def predecessor_array(n):
+    return array('i' if n < 2 ** 31 else 'q', [-1]) * n
+
+class ShortestPathTree():
+    def __init__(self, src, dist, pred, inf):
+        self.src = src
+        self.dist = dist
+        self.pred = pred
+        # The distance of the unreachable nodes
+        self.inf = inf
+
+    def reachable(self, t):
+        return self.dist[t] < self.inf
+
+    def distance(self, t):
+        return self.dist[t]
+
+    # Nodes from the source to t, None if t is not reachable
+    def path(self, t):
+        if not self.reachable(t):
+            return None
+        pred = self.pred
+        nodes = [t]
+        while t != self.src:
+            t = pred[t]
+            nodes.append(t)
+        nodes.reverse()
+        return nodes
+
+    # Yield (t, path to t) for each target
+    def paths(self, targets):
+        for t in targets:
+            yield t, self.path(t)
@@ -1,8 +1,9 @@
 import sys
 import heapq
 import math
-from doubly_list import DoublyList, Node
 import datetime
+from array import array
+from bisect import bisect_left
 
 '''
 An class of One level radix heap for supervising labeled nodes.
@@ -13,6 +14,11 @@ It provides the three heap operations as follows.
  * delete_min(): Extract the node which has a minimum distance to make it scanned.
 
 It overrides ``__len__``, that provides whether heap is empty or not.
+A batch of labeled nodes (e.g. the sources of a multi source search) is inserted in one pass with insert_many(labels, dists).
+reset(stats) empties the heap for another search without allocating, in time proportional to the number of buckets.
+
+The buckets are doubly linked lists of labels kept in preallocated parallel arrays indexed by label,
+so that the heap operations do not allocate any node object.
 
 Time complexity: O(m + nlogC)
 m: the number of edges
@@ -21,8 +27,8 @@ C: the maximum distance of one edge
 
 '''
 class RadixHeap():
-  
-  def __init__(self, n, C, debug=False):
+
+  def __init__(self, n, C, debug=False, stats=None):
 
     self.n = n
     self.C = C
@@ -30,36 +36,73 @@ class RadixHeap():
     self.B = int(math.ceil(math.log(self.C + 1, 2)) + 2)
     # Set the range of each bucket
     self.sizes = [1] + [2 ** (i - 1) for i in range(1, self.B)] + [self.n * self.C + 1]
-    # Each bucket consists of a doubly list
-    self.buckets = [DoublyList() for x in range(self.B)]
+    # Each bucket is a doubly linked list of labels, stored as a head, a tail and a length per bucket
+    self.bucket_heads = array('q', [-1]) * self.B
+    self.bucket_tails = array('q', [-1]) * self.B
+    self.bucket_lens = array('q', [0]) * self.B
     # The upper bound of each buckets which determines the position of the bucket to be inserted
     self.u = [-1] + [2 ** i - 1 for i in range(self.B - 1)] + [self.n * self.C + 1]
-    # A look up table for each node
-    self.node_table = [(self.B, None) for i in range(self.n)]
+    # The upper bounds of an empty heap, restored by reset
+    self.initial_u = list(self.u)
+    # Look up tables for each node: links in its bucket, bucket index (-1 if not in the heap) and distance
+    self.next_nodes = array('q', [-1]) * self.n
+    self.prev_nodes = array('q', [-1]) * self.n
+    self.node_buckets = array('q', [-1]) * self.n
+    self.node_keys = array('q', [0]) * self.n
     # It stores an activation of each bucket
     self.bucket_availables = [True for i in range(self.B)]
     # The number of labeled nodes in the heap
     self.len = 0
     self.debug = debug
+    # Operation counters (heap_stats.HeapStats), None when they are disabled
+    self.stats = stats
+
+  # Empty the heap for a new search, stats replaces the operation counters. The arrays indexed by label are kept:
+  # the nodes left by a search that stopped early keep a stale bucket index, which is only read for nodes in the heap
+  def reset(self, stats=None):
+    if self.len > 0:
+      for b in range(self.B):
+        self.bucket_heads[b] = self.bucket_tails[b] = -1
+        self.bucket_lens[b] = 0
+    self.u[:] = self.initial_u
+    for b in range(self.B):
+      self.bucket_availables[b] = True
+    self.len = 0
+    self.stats = stats
 
   def printResult(self):
-    # print(self.insertCallCount, self.decreseCallCount, self._insertCallCount, self.delete_minCallCount, self.updateUCallCount)
-    # print(self.insertTime / 1000.0, self.deleteMinTime/1000.0)
-    return
+    print(self.stats)
 
   # Find an appropraite bucket to insert the node from the index of the last bucket
   def insert(self, label, d):
     self._insert(label, self.B - 1, d)
     self.len += 1
+    if self.stats is not None:
+      self.stats.inserted(self.len)
     if self.debug:
       self.print_buckets('insert label : %s, distance: %s' % (label, d))
-    
+
+
+  # Insert a batch of nodes. The upper bounds are non decreasing and a node belongs to the last bucket
+  # whose upper bound is below its distance, so each bucket index is found by one bisection
+  def insert_many(self, labels, dists):
+    u = self.u
+    for label, d in zip(labels, dists):
+      self.node_keys[label] = d
+      self._append(bisect_left(u, d, 0, self.B) - 1, label)
+    self.len += len(labels)
+    if self.stats is not None:
+      self.stats.inserted(self.len, len(labels))
+      self.stats.insert_scans += len(labels)
+    if self.debug:
+      self.print_buckets('insert %s labels' % len(labels))
 
   # Remove the node from the original bucket and insert the node from the index of the bucket
   def decrease(self, label, d):
-    b, node = self.node_table[label]
-    self.buckets[b].remove(node)
+    b = self._remove(label)
     self._insert(label, b, d)
+    if self.stats is not None:
+      self.stats.decreases += 1
     if self.debug:
       self.print_buckets('decrease label: %s, distance: %s' % (label, d))
 
@@ -75,10 +118,10 @@ class RadixHeap():
         continue
 
       if d > self.u[b]:
-        curr_index = b + b_offset
-        curr_bucket = self.buckets[curr_index]
-        node = curr_bucket.append((label, d))
-        self.node_table[label] = (curr_index, node)
+        self.node_keys[label] = d
+        self._append(b + b_offset, label)
+        if self.stats is not None:
+          self.stats.insert_scans += i + 1
         break
 
       if self.bucket_availables[b] == True:
@@ -87,37 +130,55 @@ class RadixHeap():
   # Remove the minimum node from the left most bucket and redistribute the nodes from the bucket
   def delete_min(self):
     self.len -= 1
+    keys = self.node_keys
+    if self.stats is not None:
+      self.stats.delete_mins += 1
     # If the first bucket is not empty, just pop and return the node
-    if len(self.buckets[0]) > 0:
-      min_node = self.buckets[0].pop()
+    if self.bucket_lens[0] > 0:
+      min_label = self.bucket_heads[0]
+      self._remove(min_label)
+      self.node_buckets[min_label] = -1
+      if self.stats is not None:
+        self.stats.delete_min_scans += 1
       if self.debug:
-        self.print_buckets('delete min label: %s, distance: %s' % min_node.data)
-      return min_node.data
+        self.print_buckets('delete min label: %s, distance: %s' % (min_label, keys[min_label]))
+      return (min_label, keys[min_label])
 
-    moved_nodes = []
-    min_index = 0
+    next_nodes = self.next_nodes
+    min_label = -1
     # Find left most non empty bucket, find minimum node, reset upper bounds, redistribute
-    for i in range(self.B):
-      if len(self.buckets[i]) > 0:
-
-        # Extract all nodes and find minimum node at the same time
-        while len(self.buckets[i]) > 0:
-          moved_nodes.append(self.buckets[i].pop())
-          if moved_nodes[min_index].data[1] > moved_nodes[len(moved_nodes) - 1].data[1]:
-            min_index = len(moved_nodes) - 1
+    for i in range(1, self.B):
+      if self.bucket_lens[i] > 0:
+        if self.stats is not None:
+          self.stats.delete_min_scans += i + 1
+          self.stats.redistributed(self.bucket_lens[i] - 1)
+
+        # Detach all nodes and find minimum node at the same time
+        head = self.bucket_heads[i]
+        self.bucket_heads[i] = self.bucket_tails[i] = -1
+        self.bucket_lens[i] = 0
+        min_label = curr = head
+        while curr != -1:
+          if keys[min_label] > keys[curr]:
+            min_label = curr
+          curr = next_nodes[curr]
 
         # Update upper bound according to the distance of minimum node
-        self._update_u(moved_nodes[min_index].data[1], i)
+        self._update_u(keys[min_label], i)
 
         # Insert the nodes except the minmum node
-        for j, node in enumerate(moved_nodes):
-          if j != min_index:
-            self._insert(node.data[0], i, node.data[1])
+        curr = head
+        while curr != -1:
+          next_label = next_nodes[curr]
+          if curr != min_label:
+            self._insert(curr, i, keys[curr])
+          curr = next_label
         break
 
+    self.node_buckets[min_label] = -1
     if self.debug:
-      self.print_buckets('delete min label: %s, distance: %s' % moved_nodes[min_index].data)
-    return moved_nodes[min_index].data
+      self.print_buckets('delete min label: %s, distance: %s' % (min_label, keys[min_label]))
+    return (min_label, keys[min_label])
 
   # Update upper bounds using the mimimum distance and sizes
   def _update_u(self, d, j):
@@ -127,17 +188,54 @@ class RadixHeap():
       self.u[i] = min(self.u[i - 1] + self.sizes[i], self.u[j + 1])
       self.bucket_availables[i] = False if self.u[i] <= self.u[i - 1] else True
 
+  # Append the label to the tail of the bucket
+  def _append(self, b, label):
+    tail = self.bucket_tails[b]
+    self.prev_nodes[label] = tail
+    self.next_nodes[label] = -1
+    if tail == -1:
+      self.bucket_heads[b] = label
+    else:
+      self.next_nodes[tail] = label
+    self.bucket_tails[b] = label
+    self.bucket_lens[b] += 1
+    self.node_buckets[label] = b
+
+  # Unlink the label from its bucket and return the index of the bucket
+  def _remove(self, label):
+    b = self.node_buckets[label]
+    prev_label = self.prev_nodes[label]
+    next_label = self.next_nodes[label]
+    if prev_label == -1:
+      self.bucket_heads[b] = next_label
+    else:
+      self.next_nodes[prev_label] = next_label
+    if next_label == -1:
+      self.bucket_tails[b] = prev_label
+    else:
+      self.prev_nodes[next_label] = prev_label
+    self.bucket_lens[b] -= 1
+    return b
+
   def __len__(self):
     return self.len
 
   def print_buckets(self, op_name):
-    title_str = '* ------ Operation: %s ------- *' % op_name 
+    title_str = '* ------ Operation: %s ------- *' % op_name
     print('\n' + title_str)
     print('\n Bucket states : ')
-    for i, x in enumerate(self.buckets):
-      if i < len(self.buckets) - 1:
-        print(' ' + str((self.u[i], self.u[i + 1])) + ' ' + str(x.get_items()))
+    for i in range(self.B):
+      if i < self.B - 1:
+        print(' ' + str((self.u[i], self.u[i + 1])) + ' ' + str(self._get_items(i)))
       else:
-        print(' ' + str((self.u[i], '~')) + ' ' + str(x.get_items()))
+        print(' ' + str((self.u[i], '~')) + ' ' + str(self._get_items(i)))
 
     print ('\n* ' + '-' * (len(title_str) - 4) + ' *')
+
+  def _get_items(self, b):
+    items = []
+    curr = self.bucket_heads[b]
+    while curr != -1:
+      items.append((curr, self.node_keys[curr]))
+      curr = self.next_nodes[curr]
+    return items
@@ -1,7 +1,7 @@
 import sys
 import heapq
-import math
-from doubly_list import DoublyList, Node
+from array import array
+from bisect import bisect_left
 
 '''
 An class of Two level radix heap for supervising labeled nodes.
@@ -12,6 +12,18 @@ It provides the three heap operations as follows.
  * delete_min(): Extract the node which has a minimum distance to make it scanned.
 
 It overrides ``__len__``, that provides whether heap is empty or not.
+A batch of labeled nodes (e.g. the sources of a multi source search) is inserted in one pass with insert_many(labels, dists).
+reset(stats) empties the heap for another search without allocating, in time proportional to the number of segments.
+
+K is either the number of segments of every bucket or a schedule of per bucket segment counts
+(K[b] segments for the bucket b, the last count repeats for the higher buckets), e.g. (2, 4, 8) to give
+the narrow low buckets fewer segments. A segment of the bucket b is as wide as the whole bucket b - 1,
+so the nodes of a redistributed segment always fit in the lower buckets, and there are just enough buckets
+for a segment of the last bounded bucket to be wider than C.
+The segment k of the bucket b is stored as the flat segment index seg_base[b] + k, and seg_bucket maps
+a flat segment index back to its bucket.
+Each segment is a doubly linked list of labels kept in preallocated parallel arrays indexed by label,
+so that the heap operations do not allocate any node object.
 
 Time complexity: O(m + nlogC/(loglogC))
 m: the number of edges
@@ -20,89 +32,179 @@ C: the maximum distance of one edge
 
 '''
 class RadixHeap2():
-  def __init__(self, n, C, K, debug=False):
+  def __init__(self, n, C, K, debug=False, stats=None):
 
-    # the number of segments for each bucket (hyper parameter)
+    # the number of segments for each bucket (hyper parameter), an int or a per bucket schedule
     self.K = K
+    schedule = [K] if isinstance(K, int) else list(K)
+    if len(schedule) == 0 or min(schedule) < 2:
+      raise ValueError('every bucket needs at least 2 segments: %r' % (K,))
 
     # Variables that samely used in the one level heap
     self.n = n
     self.C = C
-    self.B = int(math.ceil(math.log(self.C + 1, self.K)) + 1)
-    self.sizes = [K ** i for i in range(1, self.B)] + [self.n * self.C + 1]
-    self.u = [-1] + [int(self.K * (self.K ** i - 1) / (self.K - 1) - 1) for i in range(1, self.B)] + [self.n * self.C + 1]
-    self.buckets = [[DoublyList() for i in range(self.K)] for j in range(self.B)]
+    # counts[b]: the number of segments of the bucket b, widths[b]: the width of a segment of the bucket b
+    self.counts = []
+    self.widths = [1]
+    while self.widths[-1] < self.C + 1:
+      self.counts.append(schedule[min(len(self.counts), len(schedule) - 1)])
+      self.widths.append(self.widths[-1] * self.counts[-1])
+    self.counts.append(schedule[min(len(self.counts), len(schedule) - 1)])
+    self.B = len(self.counts)
+    self.sizes = [self.counts[i] * self.widths[i] for i in range(self.B - 1)] + [self.n * self.C + 1]
+    self.u = [-1]
+    for i in range(self.B - 1):
+      self.u.append(self.u[-1] + self.sizes[i])
+    self.u.append(self.n * self.C + 1)
+    # The upper bounds of an empty heap, restored by reset
+    self.initial_u = list(self.u)
+    # Flat index of the first segment of each bucket (seg_base[B] is the number of segments) and bucket of each segment
+    self.seg_base = array('q', [0]) * (self.B + 1)
+    for i in range(self.B):
+      self.seg_base[i + 1] = self.seg_base[i] + self.counts[i]
+    self.seg_bucket = array('q')
+    for i in range(self.B):
+      self.seg_bucket.extend([i] * self.counts[i])
+    # Each segment is a doubly linked list of labels, stored as a head, a tail and a length per segment
+    self.segment_heads = array('q', [-1]) * self.seg_base[self.B]
+    self.segment_tails = array('q', [-1]) * self.seg_base[self.B]
+    self.segment_lens = array('q', [0]) * self.seg_base[self.B]
     self.bucket_availables = [True for i in range(self.B)]
     # Stores total length for each bucket
     self.bucket_lens = [0 for i in range(self.B)]
-    self.node_table = [(self.B, self.K, None) for i in range(self.n)] 
+    # Look up tables for each node: links in its segment, segment index (-1 if not in the heap) and distance
+    self.next_nodes = array('q', [-1]) * self.n
+    self.prev_nodes = array('q', [-1]) * self.n
+    self.node_segments = array('q', [-1]) * self.n
+    self.node_keys = array('q', [0]) * self.n
     self.len = 0
     self.debug = debug
+    # Operation counters (heap_stats.HeapStats), None when they are disabled
+    self.stats = stats
+
+  # Empty the heap for a new search, stats replaces the operation counters. The arrays indexed by label are kept:
+  # the nodes left by a search that stopped early keep a stale segment index, which is only read for nodes in the heap
+  def reset(self, stats=None):
+    if self.len > 0:
+      for s in range(self.seg_base[self.B]):
+        self.segment_heads[s] = self.segment_tails[s] = -1
+        self.segment_lens[s] = 0
+    self.u[:] = self.initial_u
+    for b in range(self.B):
+      self.bucket_availables[b] = True
+      self.bucket_lens[b] = 0
+    self.len = 0
+    self.stats = stats
 
   def insert(self, label, d):
     self._insert(label, self.B - 1, d)
     self.len += 1
+    if self.stats is not None:
+      self.stats.inserted(self.len)
     if self.debug == True:
       self.print_buckets('insert label : %s, distance: %s' % (label, d))
 
+  # Insert a batch of nodes. The upper bounds are non decreasing and a node belongs to the last bucket
+  # whose upper bound is below its distance, so each bucket index is found by one bisection
+  def insert_many(self, labels, dists):
+    u = self.u
+    for label, d in zip(labels, dists):
+      b = bisect_left(u, d, 0, self.B) - 1
+      self.node_keys[label] = d
+      self._append(self.seg_base[b] + self._compute_k(b, d), label)
+      self.bucket_lens[b] += 1
+    self.len += len(labels)
+    if self.stats is not None:
+      self.stats.inserted(self.len, len(labels))
+      self.stats.insert_scans += len(labels)
+    if self.debug == True:
+      self.print_buckets('insert %s labels' % len(labels))
+
   def decrease(self, label, d):
-    b, k, node = self.node_table[label]
-    self.buckets[b][k].remove(node)
-    self.bucket_lens[b] -= 1
+    b = self.seg_bucket[self._remove(label)]
     self._insert(label, b, d)
+    if self.stats is not None:
+      self.stats.decreases += 1
     if self.debug == True:
       self.print_buckets('decrease label: %s, distance: %s' % (label, d))
 
   def delete_min(self):
-    # If the first bucket is not empty, 
+    if self.stats is not None:
+      self.stats.delete_mins += 1
+    # If the first bucket is not empty,
     # find non empty segment then pop and return the node
     if self.bucket_lens[0] > 0:
-      for i in range(self.K):
-        if self.buckets[0][i].len > 0:
-          self.bucket_lens[0] -= 1
-          self.len -= 1
-          min_node = self.buckets[0][i].pop()
+      for i in range(self.counts[0]):
+        if self.segment_lens[i] > 0:
+          if self.stats is not None:
+            self.stats.delete_min_scans += i + 1
+          min_label = self._pop_segment(i)
           if self.debug:
-            self.print_buckets('delete min label: %s, distance: %s' % min_node.data)
-          return min_node.data
+            self.print_buckets('delete min label: %s, distance: %s' % (min_label, self.node_keys[min_label]))
+          return (min_label, self.node_keys[min_label])
 
-    min_node = None
+    min_label = -1
     # Find left most non empty segment, find minimum node, reset upper bounds, redistribute
     for i in range(0, self.B):
       if self.bucket_lens[i] > 0:
-        for j in range(self.K):
-          if self.buckets[i][j].len > 0:
-            min_node, _ = self._redistribute(i, j)
+        for j in range(self.counts[i]):
+          if self.segment_lens[self.seg_base[i] + j] > 0:
+            if self.stats is not None:
+              self.stats.delete_min_scans += i + j + 2
+            min_label = self._redistribute(i, j)
             break
         else:
           continue
         break
 
     if self.debug:
-      self.print_buckets('delete min label: %s, distance: %s' % min_node.data)
-    return min_node.data
+      self.print_buckets('delete min label: %s, distance: %s' % (min_label, self.node_keys[min_label]))
+    return (min_label, self.node_keys[min_label])
 
-  def _redistribute(self, b, k):
+  # Extract the minimum node of the segment and reinsert the others.
+  # The labels of the reinserted nodes are appended to moved_labels if it is given.
+  def _redistribute(self, b, k, moved_labels=None):
 
     self.len -= 1
-    moved_nodes = []
-    min_index = 0
-    # Extract all nodes and find minimum node at the same time
-    while self.buckets[b][k].len > 0:
-      moved_nodes.append(self.buckets[b][k].pop())
-      self.bucket_lens[b] -= 1
-      if moved_nodes[min_index].data[1] > moved_nodes[len(moved_nodes) - 1].data[1]:
-        min_index = len(moved_nodes) - 1
+    keys = self.node_keys
+    next_nodes = self.next_nodes
+    s = self.seg_base[b] + k
+    # Detach all nodes and find minimum node at the same time
+    head = self.segment_heads[s]
+    self.segment_heads[s] = self.segment_tails[s] = -1
+    self.bucket_lens[b] -= self.segment_lens[s]
+    if self.stats is not None:
+      self.stats.redistributed(self.segment_lens[s] - 1)
+    self.segment_lens[s] = 0
+    min_label = curr = head
+    while curr != -1:
+      if keys[min_label] > keys[curr]:
+        min_label = curr
+      curr = next_nodes[curr]
     # Update upper bound according to the distance of minimum node
-    self._update_u(moved_nodes[min_index].data[1], b, k)
-    redistributed_info = []
-    # Insert the nodes except the minmum node, store redistributed information for each node
-    for index, node in enumerate(moved_nodes):
-      if index != min_index:
-        redistributed_info.append(self._insert(node.data[0], b, node.data[1]))
+    self._update_u(keys[min_label], b, k)
+    # Insert the nodes except the minmum node
+    curr = head
+    while curr != -1:
+      next_label = next_nodes[curr]
+      if curr != min_label:
+        self._insert(curr, b, keys[curr])
+        if moved_labels is not None:
+          moved_labels.append(curr)
+      curr = next_label
 
-    return moved_nodes[min_index], redistributed_info
+    self.node_segments[min_label] = -1
+    return min_label
 
+  # Pop the first node of the segment
+  def _pop_segment(self, s):
+    self.len -= 1
+    label = self.segment_heads[s]
+    self._remove(label)
+    self.node_segments[label] = -1
+    return label
+
+  # Insert the node and return the index of the segment it is placed in
   def _insert(self, label, start_index, d):
     b_offset = 0
     # Find the appropriate bucket index according to the upper bounds
@@ -115,27 +217,56 @@ class RadixHeap2():
 
       if d > self.u[b]:
         curr_index = b + b_offset
-        curr_bucket = self.buckets[curr_index]
-        curr_k = self._compute_k(curr_index, d)
-        curr_segment = curr_bucket[curr_k]
+        s = self.seg_base[curr_index] + self._compute_k(curr_index, d)
+        self.node_keys[label] = d
+        self._append(s, label)
         self.bucket_lens[curr_index] += 1
-        node = curr_segment.append((label, d))
-        self.node_table[label] = (curr_index, curr_k, node)
-        return self.node_table[label]
-      
+        if self.stats is not None:
+          self.stats.insert_scans += i + 1
+        return s
+
       if self.bucket_availables[b] == True:
         b_offset = 0
 
+  # Append the label to the tail of the segment
+  def _append(self, s, label):
+    tail = self.segment_tails[s]
+    self.prev_nodes[label] = tail
+    self.next_nodes[label] = -1
+    if tail == -1:
+      self.segment_heads[s] = label
+    else:
+      self.next_nodes[tail] = label
+    self.segment_tails[s] = label
+    self.segment_lens[s] += 1
+    self.node_segments[label] = s
+
+  # Unlink the label from its segment and return the index of the segment
+  def _remove(self, label):
+    s = self.node_segments[label]
+    prev_label = self.prev_nodes[label]
+    next_label = self.next_nodes[label]
+    if prev_label == -1:
+      self.segment_heads[s] = next_label
+    else:
+      self.next_nodes[prev_label] = next_label
+    if next_label == -1:
+      self.segment_tails[s] = prev_label
+    else:
+      self.prev_nodes[next_label] = prev_label
+    self.segment_lens[s] -= 1
+    self.bucket_lens[self.seg_bucket[s]] -= 1
+    return s
+
   # Compute the segment index from the bucket index and distance
   def _compute_k(self, b, d):
     if b == self.B - 1:
       return 0
-    k = self.K - int(math.floor((self.u[b + 1] - d) / (self.K ** b))) - 1
-    return k
+    return self.counts[b] - (self.u[b + 1] - d) // self.widths[b] - 1
 
   # Compute the upper bound of the bucket from the index bucket and segment
   def _compute_upper_k(self, b, k):
-    return self.u[b + 1] - (self.K - k - 1) * self.K ** b
+    return self.u[b + 1] - (self.counts[b] - k - 1) * self.widths[b]
 
   def __len__(self):
     return self.len
@@ -151,19 +282,27 @@ class RadixHeap2():
         self.bucket_availables[i] = True
 
   def print_buckets(self, op_name):
-    title_str = '* ------ Operation: %s ------- *' % op_name 
+    title_str = '* ------ Operation: %s ------- *' % op_name
     print('\n' + title_str)
     print('\n Bucket states : ')
-    for i, x in enumerate(self.buckets):
-      if i < len(self.buckets) - 1:
-        print(' ' + str((self.u[i], self.u[i + 1])) + ' ' + self._str_bucket(x))
+    for i in range(self.B):
+      if i < self.B - 1:
+        print(' ' + str((self.u[i], self.u[i + 1])) + ' ' + self._str_bucket(i))
       else:
-        print(' ' + str((self.u[i], '~')) + ' ' + self._str_bucket(x))
+        print(' ' + str((self.u[i], '~')) + ' ' + self._str_bucket(i))
 
     print ('\n* ' + '-' * (len(title_str) - 4) + ' *')
 
-  def _str_bucket(self, bucket):
+  def _str_bucket(self, b):
     result = ''
-    for index in range(self.K):
-      result += '\n    ' + str(index) + ': ' + str(bucket[index].get_items())
-    return result
\ No newline at end of file
+    for index in range(self.counts[b]):
+      result += '\n    ' + str(index) + ': ' + str(self._get_items(self.seg_base[b] + index))
+    return result
+
+  def _get_items(self, s):
+    items = []
+    curr = self.segment_heads[s]
+    while curr != -1:
+      items.append((curr, self.node_keys[curr]))
+      curr = self.next_nodes[curr]
+    return items
@@ -1,44 +1,70 @@
 import os, sys
-from dijkstra import Graph
-from collections import defaultdict
-import datetime
+import argparse
+import backends
+import benchmark
+import dimacs
+
+parser = argparse.ArgumentParser(description='Compare the dijkstra algorithms on a DIMACS shortest path file')
+parser.add_argument('input', help='input file')
+parser.add_argument('-v', dest='debug', action='store_true', help='print the state of the heap for each step (runs each algorithm once)')
+parser.add_argument('--src', type=int, default=0, help='source node (0 based)')
+parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per algorithm')
+parser.add_argument('--warmup', type=int, default=1, help='untimed runs per algorithm before timing')
+parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc peak memory run')
+parser.add_argument('--stats', action='store_true', help='print the operation counters of each heap')
+parser.add_argument('--label', help='version label stored with the results')
+parser.add_argument('--json', help='write the results to a JSON file')
+parser.add_argument('--csv', help='write the results to a CSV file')
+parser.add_argument('--backends', help='comma separated backend specs to run (heapq, delta, auto or %s, e.g. radix2:K=8), all by default'
+                    % ' | '.join(backends.names()))
+parser.add_argument('--predecessors', action='store_true', help='also time each backend while it records predecessors')
+parser.add_argument('--calibrate', action='store_true', help='time the backends on the input and add it to the cost model of auto')
+args = parser.parse_args()
 
-node_dict = defaultdict(lambda: [])
-n = 0
-C = 0
 # Sample data used on http://www.dis.uniroma1.it/challenge9/download.shtml
 # input file format also follows origin file format.
 # ex) a 1 2 803
-for line in open(sys.argv[1]):
-    line = line.strip()
-    if line.startswith("a"):
-        command, parent_node, child_node, distance = line.split()
-        
-        parent_node = int(parent_node) - 1
-        child_node = int(child_node) - 1
-        distance = int(distance)
-        if C < distance:
-            C = distance
-
-        # save data in dictionary
-        node_dict[parent_node].append((child_node, distance))
-    else:
-        continue
+graph = dimacs.load(args.input)
 
-# Convert dictionary to graph list
-n = max(node_dict.keys()) + 1
-adjacents = [x[1] for x in sorted(node_dict.items(), key=lambda x: x[0])]
+if args.calibrate:
+    sample = backends.calibrate(graph, src=args.src, repeat=args.repeat)
+    for spec, cost in sorted(sample['ns_per_item'].items(), key=lambda item: item[1]):
+        print(spec, ':', '%.1f ns per node and arc' % cost)
+    print('auto :', backends.choose(graph.n, graph.m, graph.C))
+    sys.exit()
 
-def print_result(str, start_time, dist):
-    print("---------------------------")
-    print(str, ":", int((datetime.datetime.now() - start_time).total_seconds() * 1000) / 1000.0, len(dist), sum(dist))
+selected = benchmark.BACKENDS
+if args.backends:
+    selected = []
+    for spec in args.backends.split(','):
+        if spec == 'heapq':
+            selected.append(('heapq', None))
+        elif spec == benchmark.DELTA:
+            selected.append(('Delta-stepping', benchmark.DELTA))
+        elif spec == 'auto':
+            selected.append(('auto (%s)' % backends.choose(graph.n, graph.m, graph.C), 'auto'))
+        else:
+            backends.parse(spec)
+            selected.append((spec, spec))
 
+if args.debug:
+    for name, level in selected:
+        print('---------------------------')
+        print(name)
+        benchmark.solve(graph, args.src, level, debug=True)
+    sys.exit()
 
 # Run all algoritms
-graph = Graph(n, C, adjacents)
-debug = True if '-v' in sys.argv else False
 print(' Start execute dijkstra algorithms')
-print_result("heapq", datetime.datetime.now(), graph.dijkstra_naive(0))
-print_result("Radix level1", datetime.datetime.now(), graph.dijkstra_radix(0, debug=debug))
-print_result("Radix level2", datetime.datetime.now(), graph.dijkstra_radix(0, level='Two level', debug=debug))
-print_result("Fib. Heap", datetime.datetime.now(), graph.dijkstra_radix(0, level='Two level + Fibonacci Heap', debug=debug))
+results = benchmark.run(graph, src=args.src, repeat=args.repeat, warmup=args.warmup, memory=args.memory, backends=selected)
+benchmark.print_results(results)
+if args.stats:
+    benchmark.print_stats(benchmark.collect_stats(graph, src=args.src, backends=selected))
+if args.predecessors:
+    benchmark.print_overhead(benchmark.predecessor_overhead(graph, src=args.src, repeat=args.repeat, warmup=args.warmup, backends=selected))
+
+meta = benchmark.metadata(graph, path=args.input, label=args.label)
+if args.json:
+    benchmark.write_json(results, args.json, meta)
+if args.csv:
+    benchmark.write_csv(results, args.csv, meta)
@@ -0,0 +1,27 @@
+import argparse
+import benchmark
+import generate
+
+parser = argparse.ArgumentParser(description='Scaling of the parallel delta-stepping on generated graphs of increasing size')
+parser.add_argument('--sizes', default='100000,200000,400000', help='comma separated numbers of nodes')
+parser.add_argument('--degree', type=int, default=8, help='arcs per node')
+parser.add_argument('--C', type=int, default=1000, help='maximum arc weight')
+parser.add_argument('--workers', default='1,2,4', help='comma separated numbers of worker processes')
+parser.add_argument('--repeat', type=int, default=3, help='timed repetitions per configuration')
+parser.add_argument('--label', help='version label stored with the results')
+parser.add_argument('--json', help='write the results to a JSON file')
+parser.add_argument('--csv', help='write the results to a CSV file')
+args = parser.parse_args()
+
+workers = [int(count) for count in args.workers.split(',')]
+results = []
+for n in (int(size) for size in args.sizes.split(',')):
+    graph = generate.random_graph(n, degree=args.degree, C=args.C)
+    results.extend(benchmark.delta_scaling(graph, workers=workers, repeat=args.repeat))
+benchmark.print_scaling(results)
+
+meta = {'label': args.label, 'degree': args.degree, 'C': args.C}
+if args.json:
+    benchmark.write_json(results, args.json, meta)
+if args.csv:
+    benchmark.write_csv(results, args.csv, meta, fields=benchmark.SCALING_FIELDS)
@@ -0,0 +1,96 @@
+import argparse
+import random
+from heap_stats import HeapStats
+
+'''
+Search of per bucket segment schedules for the two level radix heap (and the Fibonacci heap extension).
+
+A workload is a graph and the sources of the searches run on it, e.g. the sources seen by a service.
+A schedule is evaluated by running the searches with operation counters. The default objective is the
+number of redistributed nodes plus the buckets and segments scanned, since the redistributions alone
+only fall by giving the buckets more segments, which are then scanned by every delete_min.
+
+The search starts from the best uniform schedule and changes the count of one bucket at a time,
+keeping a change that lowers the cost, until a pass over all buckets does not improve it.
+'''
+
+CHOICES = (2, 3, 4, 6, 8, 16)
+
+def work(stats):
+    return stats.moved_nodes + stats.insert_scans + stats.delete_min_scans
+
+def moved_nodes(stats):
+    return stats.moved_nodes
+
+# Cost of a schedule on the workload
+def evaluate(graph, sources, schedule, fibonacci=False, objective=work):
+    stats = HeapStats()
+    level = 'fibonacci' if fibonacci else 'radix2'
+    for src in sources:
+        graph.dijkstra_radix(src, level=level, stats=stats, K=tuple(schedule))
+    return objective(stats)
+
+# The number of buckets of the schedule (counts of the higher buckets are not used)
+def _levels(graph, schedule):
+    width = 1
+    levels = 0
+    while width < graph.C + 1:
+        width *= schedule[min(levels, len(schedule) - 1)]
+        levels += 1
+    return levels + 1
+
+# Returns (schedule, cost, costs of the evaluated schedules)
+def tune(graph, sources, choices=CHOICES, fibonacci=False, objective=work, passes=3):
+    costs = {}
+
+    def cost(schedule):
+        # Write the count of every bucket, schedules that only differ in unused higher buckets are the same heap
+        schedule = tuple(schedule[min(b, len(schedule) - 1)] for b in range(_levels(graph, schedule)))
+        if schedule not in costs:
+            costs[schedule] = evaluate(graph, sources, schedule, fibonacci, objective)
+        return costs[schedule], schedule
+
+    best_cost, best = min(cost((k,)) for k in choices)
+    best = list(best)
+    for _ in range(passes):
+        improved = False
+        b = 0
+        while b < len(best):
+            for k in choices:
+                if k == best[b]:
+                    continue
+                candidate = best[:b] + [k] + best[b + 1:]
+                candidate_cost, candidate = cost(candidate)
+                if candidate_cost < best_cost:
+                    best_cost, best = candidate_cost, list(candidate)
+                    improved = True
+            b += 1
+        if not improved:
+            break
+    return tuple(best), best_cost, costs
+
+if __name__ == '__main__':
+    import dimacs
+    parser = argparse.ArgumentParser(description='Search a segment schedule of the two level radix heap for a workload')
+    parser.add_argument('input', help='input file')
+    parser.add_argument('--sources', help='comma separated source nodes (0 based) of the workload')
+    parser.add_argument('--samples', type=int, default=5, help='number of random sources when --sources is not given')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random sources')
+    parser.add_argument('--fibonacci', action='store_true', help='tune the Fibonacci heap extension')
+    parser.add_argument('--moved-only', action='store_true', help='minimize the redistributed nodes only')
+    args = parser.parse_args()
+
+    graph = dimacs.load(args.input)
+    if args.sources:
+        sources = [int(src) for src in args.sources.split(',')]
+    else:
+        rand = random.Random(args.seed)
+        sources = [rand.randrange(graph.n) for _ in range(args.samples)]
+    objective = moved_nodes if args.moved_only else work
+
+    schedule, best_cost, costs = tune(graph, sources, fibonacci=args.fibonacci, objective=objective)
+    for k in CHOICES:
+        uniform = costs[tuple([k] * _levels(graph, (k,)))]
+        print('K=%s : %s' % (k, uniform))
+    print('best : %s' % best_cost)
+    print('spec : %s:K=%s' % ('fibonacci' if args.fibonacci else 'radix2', '/'.join(str(k) for k in schedule)))
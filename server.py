@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+import backends
+
+'''
+Long running query service: the graph is loaded once and the searches are answered over a local socket.
+
+The service speaks a small subset of HTTP/1.1 (GET requests, keep-alive connections) on a TCP port or a unix socket:
+ * GET /distance?s=S&t=T : {"s": S, "t": T, "distance": d}, d is null if T is not reachable
+ * GET /distances?src=S[&targets=a,b,c] : {"src": S, "distances": [...]}, the distances of the targets or of every node
+ * GET /metrics : counters, latency percentiles and throughput
+Node ids are 0 based.
+
+The searches run on a pool of worker processes that map the arcs from shared memory (parallel.SharedGraph),
+and every worker answers from a reused workspace.QueryWorkspace, so a query does not rebuild a heap. The requests
+for the same source that arrive within the batch window are answered by one search: a single target stops the
+search at the target, several targets or a whole distance vector need a search of the reachable nodes.
+While a search of a source runs, its new requests wait for it to finish and then go into the next search together.
+With workers=0 the searches run in a thread of the server process instead.
+The pool starts its workers on the first search, from the event loop, so they are started by a fork server
+(spawned where there is none): a forked worker would inherit the client sockets open at that moment and
+keep them open after the server closes them.
+A search that fails (e.g. its worker was killed) answers its requests with an error. A broken pool is replaced
+by a new one, so the following requests are served again.
+'''
+
+# Requests and searches counted by the metrics
+COUNTERS = ['requests', 'errors', 'searches', 'batched_requests', 'connections', 'pool_restarts']
+# The latencies kept for the percentiles
+LATENCY_WINDOW = 4096
+
+class ServerMetrics():
+    def __init__(self):
+        self.started = time.monotonic()
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+        self.in_flight = 0
+        # Seconds of the last requests and the completion times for the throughput
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.completions = collections.deque(maxlen=LATENCY_WINDOW)
+        self.endpoints = collections.Counter()
+
+    def finished(self, endpoint, started):
+        now = time.monotonic()
+        self.requests += 1
+        self.endpoints[endpoint] += 1
+        self.latencies.append(now - started)
+        self.completions.append(now)
+
+    def as_dict(self):
+        now = time.monotonic()
+        latencies = sorted(self.latencies)
+        result = {counter: getattr(self, counter) for counter in COUNTERS}
+        result['in_flight'] = self.in_flight
+        result['uptime_s'] = now - self.started
+        result['endpoints'] = dict(self.endpoints)
+        for p in (50, 95, 99):
+            result['p%d_ms' % p] = 1000 * latencies[max(0, -(-len(latencies) * p // 100) - 1)] if latencies else None
+        # Requests per second over the window of the last completions (at most 10 seconds back)
+        recent = [t for t in self.completions if now - t <= 10]
+        result['requests_per_s'] = len(recent) / max(now - recent[0], 1e-3) if len(recent) > 1 else 0.0
+        result['mean_requests_per_s'] = self.requests / max(now - self.started, 1e-3)
+        return result
+
+class QueryServer():
+    def __init__(self, graph, backend='One Level', workers=None, batch_window=0.001):
+        if backend != 'auto':
+            backends.parse(backend)
+        self.graph = graph
+        self.backend = backend
+        self.batch_window = batch_window
+        self.metrics = ServerMetrics()
+        # source -> batch collecting its requests until it is submitted: [targets, whole vector wanted, future]
+        self.pending = {}
+        # Sources with a search in the pool
+        self.running = set()
+        self.shared = None
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        if workers == 0:
+            _init_local(graph, backend)
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        else:
+            import parallel
+            self.shared = parallel.SharedGraph(graph)
+            self.pool = self._process_pool()
+
+    def _process_pool(self):
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(self.shared.name, self.backend))
+
+    # Replace the pool after one of its workers died, unless it was already replaced
+    def _restart_pool(self, pool):
+        if pool is self.pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._process_pool()
+            self.metrics.pool_restarts += 1
+
+    # Distance from s to t, None if t is not reachable
+    async def distance(self, s, t):
+        return (await self.distances(s, [t]))[0]
+
+    # Distances from src to the targets (every node if targets is None), None for the unreachable nodes
+    async def distances(self, src, targets=None):
+        self._check_node(src)
+        if targets is None:
+            return await self._batch(src, None)
+        for t in targets:
+            self._check_node(t)
+        if not targets:
+            return []
+        # target -> distance, or the list of every distance when the batch also wanted the whole vector
+        result = await self._batch(src, targets)
+        return [result[t] for t in targets]
+
+    def _check_node(self, v):
+        if not 0 <= v < self.graph.n:
+            raise ValueError('node %s is not in the graph (0 to %s)' % (v, self.graph.n - 1))
+
+    # Join the batch of the source (targets None asks for every node), returns a future of the search
+    def _batch(self, src, targets):
+        batch = self.pending.get(src)
+        if batch is None:
+            loop = asyncio.get_running_loop()
+            batch = self.pending[src] = [set(), False, loop.create_future()]
+            if src not in self.running:
+                loop.call_later(self.batch_window, self._submit, src)
+        else:
+            self.metrics.batched_requests += 1
+        if targets is None:
+            batch[1] = True
+        else:
+            batch[0].update(targets)
+        return batch[2]
+
+    def _submit(self, src):
+        targets, whole, future = self.pending.pop(src)
+        self.metrics.searches += 1
+        pool = self.pool
+        try:
+            result = asyncio.wrap_future(pool.submit(_search, src, None if whole else sorted(targets)))
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._restart_pool(pool)
+            if not future.cancelled():
+                future.set_exception(e)
+            return
+        self.running.add(src)
+        result.add_done_callback(lambda done: self._finished(src, done, future, pool))
+
+    def _finished(self, src, done, future, pool):
+        self.running.discard(src)
+        error = None if done.cancelled() else done.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._restart_pool(pool)
+        if not future.cancelled():
+            if done.cancelled():
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result())
+        # The requests that arrived during the search
+        if src in self.pending:
+            self._submit(src)
+
+    async def start(self, host='127.0.0.1', port=8080, path=None):
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle, path=path)
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer):
+        self.metrics.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.monotonic()
+                request = request_line.decode('latin-1').split()
+                self.metrics.in_flight += 1
+                try:
+                    status, body = await self._respond(request)
+                finally:
+                    self.metrics.in_flight -= 1
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(body).encode()
+                writer.write(b'HTTP/1.1 %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n'
+                             % (status.encode(), len(data), b'keep-alive' if keep_alive else b'close') + data)
+                await writer.drain()
+                self.metrics.finished(urlsplit(request[1]).path if len(request) > 1 else '', started)
+                if not status.startswith('200'):
+                    self.metrics.errors += 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # The server is closing
+            pass
+        finally:
+            writer.close()
+
+    # (status, JSON body) of a request line split into method, target and version
+    async def _respond(self, request):
+        if len(request) != 3 or request[0] != 'GET':
+            return '405 Method Not Allowed', {'error': 'only GET requests are served'}
+        url = urlsplit(request[1])
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/distance':
+                s = int(query['s'])
+                t = int(query['t'])
+                return '200 OK', {'s': s, 't': t, 'distance': await self.distance(s, t)}
+            if url.path == '/distances':
+                src = int(query['src'])
+                targets = [int(t) for t in query['targets'].split(',') if t] if 'targets' in query else None
+                return '200 OK', {'src': src, 'distances': await self.distances(src, targets)}
+            if url.path == '/metrics':
+                return '200 OK', self.metrics.as_dict()
+        except KeyError as e:
+            return '400 Bad Request', {'error': 'missing parameter %s' % e}
+        except ValueError as e:
+            return '400 Bad Request', {'error': str(e)}
+        except Exception as e:
+            return '500 Internal Server Error', {'error': repr(e)}
+        return '404 Not Found', {'error': 'unknown path %s' % url.path}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+# The workspace that answers the searches of a worker process (or of the server thread with workers=0)
+_worker = None
+
+def _init_worker(name, backend):
+    global _worker
+    import parallel
+    shm, graph = parallel.attach(name)
+    _worker = (shm, graph.workspace(backend))
+
+def _init_local(graph, backend):
+    global _worker
+    _worker = (None, graph.workspace(backend))
+
+# target -> distance for the targets, or the distance list of every node when targets is None
+def _search(src, targets):
+    workspace = _worker[1]
+    inf = workspace.inf
+    if targets is not None and len(targets) == 1:
+        d = workspace.shortest_path(src, targets[0])
+        return {targets[0]: d if d < inf else None}
+    workspace.search(src)
+    if targets is None:
+        return [d if d < inf else None for d in workspace.distances()]
+    return {t: workspace.distance(t) if workspace.distance(t) < inf else None for t in targets}
+
+if __name__ == '__main__':
+    import dimacs
+    parser = argparse.ArgumentParser(description='Serve shortest path queries on a DIMACS graph over a local socket')
+    parser.add_argument('input', help='input file')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='TCP port to listen on')
+    parser.add_argument('--unix', help='listen on this unix socket path instead of TCP')
+    parser.add_argument('--backend', default='One Level', help='backend spec of the searches (auto or %s)' % ' | '.join(backends.names()))
+    parser.add_argument('--workers', type=int, help='worker processes (number of CPUs by default, 0 searches in the server process)')
+    parser.add_argument('--batch-ms', type=float, default=1.0, help='window in ms that collects the requests of a source into one search')
+    args = parser.parse_args()
+
+    async def main():
+        query_server = QueryServer(dimacs.load(args.input), backend=args.backend, workers=args.workers, batch_window=args.batch_ms / 1000)
+        try:
+            server = await query_server.start(args.host, args.port, path=args.unix)
+            print('listening on', args.unix or '%s:%s' % (args.host, args.port))
+            async with server:
+                await server.serve_forever()
+        finally:
+            query_server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules are imported from the top of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+INPUTS = os.path.join(ROOT, 'inputs')
@@ -0,0 +1,13 @@
+import pytest
+import backends
+
+# A decrease before the first delete_min gives the smallest distance of the heap
+@pytest.mark.parametrize('spec', backends.names())
+def test_decrease_before_first_delete_min(spec):
+    heap = backends.create(spec, 4, 10)
+    heap.insert(0, 5)
+    heap.decrease(0, 1)
+    heap.insert(1, 3)
+    assert heap.delete_min() == (0, 1)
+    assert heap.delete_min() == (1, 3)
+    assert len(heap) == 0
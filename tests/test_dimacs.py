@@ -0,0 +1,27 @@
+import os
+import shutil
+import pytest
+import dimacs
+from conftest import INPUTS
+
+HEADER = os.path.join(INPUTS, 'header.txt')
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_read_problem_line(monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(dimacs, 'np', None)
+    n, C, offsets, targets, weights = dimacs.read(HEADER)
+    # Node 6 has no arcs, n is the one of the problem line
+    assert (n, C) == (6, 8)
+    assert list(offsets) == [0, 2, 3, 5, 6, 7, 7]
+    assert list(targets) == [1, 2, 3, 1, 3, 4, 0]
+    assert list(weights) == [4, 1, 5, 2, 8, 3, 7]
+
+def test_load_problem_line(tmp_path):
+    path = str(tmp_path / 'header.txt')
+    shutil.copy(HEADER, path)
+    for _ in range(2):
+        # The second load maps the binary cache
+        graph = dimacs.load(path)
+        assert graph.n == 6
+        assert graph.dijkstra_radix(0) == [0, 3, 1, 8, 11, 6 * 8 + 1]
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import os
+import signal
+import dimacs
+import server
+from conftest import INPUTS
+
+async def get(port, target):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(b'GET %s HTTP/1.1\r\nConnection: close\r\n\r\n' % target.encode())
+        response = await asyncio.wait_for(reader.read(), 30)
+    finally:
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+# A killed worker fails the search it would run, then the pool is replaced and the queries are answered again
+def test_killed_worker():
+    graph = dimacs.load(os.path.join(INPUTS, 'node20.txt'), cache=False)
+    expected = graph.dijkstra_radix(0)[5]
+
+    async def main():
+        query_server = server.QueryServer(graph, workers=1)
+        try:
+            listener = await query_server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            assert await get(port, '/distance?s=0&t=5') == (200, {'s': 0, 't': 5, 'distance': expected})
+
+            pid = await asyncio.wrap_future(query_server.pool.submit(os.getpid))
+            os.kill(pid, signal.SIGKILL)
+            await asyncio.sleep(0.5)
+            status, body = await get(port, '/distance?s=0&t=5')
+            assert status == 500 and 'BrokenProcessPool' in body['error']
+
+            assert await get(port, '/distance?s=0&t=5') == (200, {'s': 0, 't': 5, 'distance': expected})
+            assert query_server.metrics.pool_restarts == 1
+            listener.close()
+            await listener.wait_closed()
+        finally:
+            query_server.close()
+
+    asyncio.run(main())
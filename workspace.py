@@ -0,0 +1,98 @@
+'''
+Reusable state of the searches on one graph, so that back to back queries do not allocate anything of size n.
+
+A workspace keeps a heap of one backend, emptied by its reset() before each search, and the distances of the
+last search stamped with its generation. The stamp is folded into the stored value: every search raises a base by
+n * C + 2 and stores base - d for a distance d, so every value left by an earlier search is below base - (n * C + 1)
+and reads as "not reached" without being cleared. A relaxation is then one comparison, as with a fresh list.
+The nodes reached by the search are listed in a preallocated list, which gives its results in time
+proportional to the nodes it reached.
+
+The results are valid until the next search of the same workspace.
+'''
+
+class QueryWorkspace():
+    # C bounds the keys of the heap (the largest arc weight of the graph by default)
+    def __init__(self, graph, backend='One Level', C=None, **params):
+        self.graph = graph
+        self.heap = graph._make_heap(backend, C=C, **params)
+        # The distance of the nodes that are not reached
+        self.inf = graph.n * graph.C + 1
+        # base - distance of the nodes reached by the search of the current base
+        self.values = [0] * graph.n
+        self.base = 0
+        # The nodes reached by the last search, in the order they were reached
+        self.reached_nodes = [0] * graph.n
+        self.reached_count = 0
+
+    # Start a new search: the distances of the previous one are dropped and the heap is emptied
+    def begin(self, stats=None):
+        self.base += self.inf + 1
+        self.reached_count = 0
+        self.heap.reset(stats)
+        return self.heap
+
+    # Search every node reachable from src
+    def search(self, src, stats=None):
+        self._search(src, -1, stats)
+
+    # Distance from s to t, n * C + 1 if t is not reachable. The search stops as soon as t is extracted
+    def shortest_path(self, s, t, stats=None):
+        return self._search(s, t, stats)
+
+    def _search(self, src, target, stats):
+        heap = self.begin(stats)
+        base = self.base
+        # The values below it were stored by earlier searches
+        unreached = base - self.inf
+        values = self.values
+        reached_nodes = self.reached_nodes
+        offsets = self.graph.offsets
+        targets = self.graph.targets
+        weights = self.graph.weights
+        values[src] = base
+        reached_nodes[0] = src
+        count = 1
+        heap.insert(src, 0)
+
+        while len(heap) > 0:
+            u, d = heap.delete_min()
+            if u == target:
+                break
+
+            value = base - d
+            start = offsets[u]
+            end = offsets[u + 1]
+            for v, weight in zip(targets[start:end], weights[start:end]):
+                if values[v] < value - weight:
+                    if values[v] < unreached:
+                        reached_nodes[count] = v
+                        count += 1
+                        heap.insert(v, d + weight)
+                    else:
+                        heap.decrease(v, d + weight)
+                    values[v] = value - weight
+
+        self.reached_count = count
+        return self.distance(target) if target != -1 else None
+
+    # Distance of v found by the last search, n * C + 1 if it was not reached
+    def distance(self, v):
+        value = self.values[v]
+        return self.base - value if value > self.base - self.inf else self.inf
+
+    # Iterate (node, distance) of the nodes reached by the last search. A search that stopped at its target
+    # also reached nodes whose distances are only upper bounds
+    def reached(self):
+        values = self.values
+        base = self.base
+        for i in range(self.reached_count):
+            v = self.reached_nodes[i]
+            yield v, base - values[v]
+
+    # The distances of the last search as a list of length n, in the layout of Graph.dijkstra_radix
+    def distances(self):
+        dist = [self.inf] * self.graph.n
+        for v, d in self.reached():
+            dist[v] = d
+        return dist